@@ -0,0 +1,35 @@
+"""Add voucher_code_sequences table
+
+Revision ID: 1b5e7d9f3a24
+Revises: 0a4d6c8e2f13
+Create Date: 2026-10-18 20:12:40.318544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b5e7d9f3a24'
+down_revision: Union[str, None] = '0a4d6c8e2f13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    sequences = op.create_table(
+        'voucher_code_sequences',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('next_value', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # 预先写入序号行，避免多个进程首次领取时并发插入
+    op.bulk_insert(sequences, [{'name': 'voucher_code', 'next_value': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('voucher_code_sequences')
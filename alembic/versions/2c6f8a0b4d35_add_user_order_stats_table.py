@@ -0,0 +1,43 @@
+"""Add user_order_stats table
+
+Revision ID: 2c6f8a0b4d35
+Revises: 1b5e7d9f3a24
+Create Date: 2026-10-18 21:03:27.905116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c6f8a0b4d35'
+down_revision: Union[str, None] = '1b5e7d9f3a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'user_order_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('order_count', sa.Integer(), nullable=False),
+        sa.Column('first_order_at', sa.DateTime(), nullable=True),
+        sa.Column('total_spent', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    # 由已有订单回填汇总
+    op.execute(
+        "INSERT INTO user_order_stats (user_id, order_count, first_order_at, total_spent, updated_at) "
+        "SELECT user_id, COUNT(*), MIN(created_at), COALESCE(SUM(order_amount), 0), UTC_TIMESTAMP() "
+        "FROM orders GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_order_stats')
@@ -0,0 +1,30 @@
+"""Add order history indexes
+
+Revision ID: 3d7a9c1e5f46
+Revises: 2c6f8a0b4d35
+Create Date: 2026-10-18 21:48:09.217753
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7a9c1e5f46'
+down_revision: Union[str, None] = '2c6f8a0b4d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_orders_user_id_created_at_id', 'orders', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_coupon_id', 'orders', ['coupon_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_orders_coupon_id', table_name='orders')
+    op.drop_index('ix_orders_user_id_created_at_id', table_name='orders')
@@ -0,0 +1,35 @@
+"""Add catalog_versions table
+
+Revision ID: 4e8b0d2f6a57
+Revises: 3d7a9c1e5f46
+Create Date: 2026-10-18 22:31:54.608217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8b0d2f6a57'
+down_revision: Union[str, None] = '3d7a9c1e5f46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    versions = op.create_table(
+        'catalog_versions',
+        sa.Column('name', sa.String(length=32), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    # 预先写入版本行，店铺写入时只需 UPDATE 自增
+    op.bulk_insert(versions, [{'name': 'shops', 'version': 0}])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('catalog_versions')
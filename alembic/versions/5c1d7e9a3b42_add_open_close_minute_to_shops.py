@@ -0,0 +1,66 @@
+"""Add open_minute and close_minute columns to shops
+
+Revision ID: 5c1d7e9a3b42
+Revises: 239e2dc9ba5e
+Create Date: 2026-10-18 09:12:31.418203
+
+"""
+from typing import Sequence, Union
+
+from sqlalchemy.sql import text
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d7e9a3b42'
+down_revision: Union[str, None] = '239e2dc9ba5e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 回填使用的营业时间解析规则冻结在本迁移中（与编写本迁移时的 backend.business_hours 一致），
+# 之后修改应用代码不会改变本迁移的结果
+def _parse_clock(value: str) -> int:
+    hour, minute = map(int, value.strip().split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"invalid clock value '{value}'")
+    return hour * 60 + minute
+
+
+def _parse_business_hours(business_hours):
+    if not business_hours:
+        return None
+    try:
+        open_str, close_str = business_hours.split('-')
+        return _parse_clock(open_str), _parse_clock(close_str)
+    except ValueError:
+        return None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('open_minute', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('close_minute', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_shops_open_close_minute', ['open_minute', 'close_minute'], unique=False)
+
+    # 回填已有店铺的营业时间分钟数
+    conn = op.get_bind()
+    shops = conn.execute(text("SELECT id, business_hours FROM shops")).fetchall()
+    for shop in shops:
+        hours = _parse_business_hours(shop.business_hours)
+        if hours is None:
+            continue
+        conn.execute(
+            text("UPDATE shops SET open_minute = :open_minute, close_minute = :close_minute WHERE id = :shop_id"),
+            {"open_minute": hours[0], "close_minute": hours[1], "shop_id": shop.id}
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index('ix_shops_open_close_minute')
+        batch_op.drop_column('close_minute')
+        batch_op.drop_column('open_minute')
@@ -0,0 +1,105 @@
+"""Rebuild shop_search_tokens with accent and width folding
+
+Revision ID: 5f9c1e3a7b68
+Revises: 4e8b0d2f6a57
+Create Date: 2026-10-19 09:42:17.385120
+
+"""
+from typing import Sequence, Union
+import unicodedata
+
+from sqlalchemy.sql import text
+from alembic import op
+import sqlalchemy as sa
+from pypinyin import lazy_pinyin, Style
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f9c1e3a7b68'
+down_revision: Union[str, None] = '4e8b0d2f6a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 回填使用的分词规则冻结在本迁移中（与编写本迁移时的 backend.tokenizer 一致），
+# 之后修改分词规则不会改变本迁移的结果；需要按新规则重建索引时应新增迁移
+_MAX_TOKEN_LENGTH = 32
+_SPACE_MARK = "\u2423"
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def _char_ngrams(text):
+    text = text.replace(" ", _SPACE_MARK)
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _pinyin_syllables(text):
+    return [_normalize(s).strip() for s in lazy_pinyin(text or "") if s.strip()]
+
+
+def _pinyin_initials(text):
+    return "".join(
+        ch for ch in _normalize("".join(lazy_pinyin(text or "", style=Style.FIRST_LETTER)))
+        if ch.isalnum()
+    )
+
+
+def _pinyin_full(text):
+    return "".join(ch for ch in _normalize("".join(lazy_pinyin(text or ""))) if ch.isalnum())
+
+
+def _prefixed(prefix, values):
+    return {prefix + v for v in values if v and len(prefix + v) <= _MAX_TOKEN_LENGTH}
+
+
+def _shop_tokens(name, category, name_pinyin, category_pinyin):
+    tokens = set()
+    for field in (name, category, name_pinyin, category_pinyin):
+        tokens |= _prefixed("g:", _char_ngrams(_normalize(field)))
+    tokens |= _prefixed("s:", _pinyin_syllables(name) + _pinyin_syllables(category))
+    for field in (name, category):
+        tokens |= _prefixed("i:", _char_ngrams(_pinyin_initials(field)))
+        tokens |= _prefixed("f:", _char_ngrams(_pinyin_full(field)))
+    return tokens
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 分词改为折叠重音与全角 / 半角，按新规则重建拼音派生列与倒排索引
+    conn = op.get_bind()
+    conn.execute(text("DELETE FROM shop_search_tokens"))
+    shops = conn.execute(text("SELECT id, name, category, name_pinyin, category_pinyin FROM shops")).fetchall()
+    for shop in shops:
+        conn.execute(
+            text(
+                "UPDATE shops SET name_pinyin_full = :name_full, name_initials = :name_initials, "
+                "category_pinyin_full = :category_full, category_initials = :category_initials "
+                "WHERE id = :shop_id"
+            ),
+            {
+                "name_full": _pinyin_full(shop.name)[:255],
+                "name_initials": _pinyin_initials(shop.name)[:100],
+                "category_full": _pinyin_full(shop.category)[:150],
+                "category_initials": _pinyin_initials(shop.category)[:50],
+                "shop_id": shop.id
+            }
+        )
+        tokens = _shop_tokens(shop.name, shop.category, shop.name_pinyin, shop.category_pinyin)
+        if tokens:
+            conn.execute(
+                text("INSERT INTO shop_search_tokens (token, shop_id) VALUES (:token, :shop_id)"),
+                [{"token": token, "shop_id": shop.id} for token in tokens]
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 只重建了数据，没有结构变更；降级后如需按旧分词规则查询，需重新回填倒排索引
+    pass
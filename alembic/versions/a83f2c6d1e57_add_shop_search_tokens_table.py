@@ -0,0 +1,90 @@
+"""Add shop_search_tokens inverted index table
+
+Revision ID: a83f2c6d1e57
+Revises: 5c1d7e9a3b42
+Create Date: 2026-10-18 10:03:47.552916
+
+"""
+from typing import Sequence, Union
+
+from sqlalchemy.sql import text
+from alembic import op
+import sqlalchemy as sa
+from pypinyin import lazy_pinyin, Style
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83f2c6d1e57'
+down_revision: Union[str, None] = '5c1d7e9a3b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 回填使用的分词规则冻结在本迁移中（与编写本迁移时的 backend.tokenizer 一致），
+# 之后修改分词规则不会改变本迁移的结果；需要按新规则重建索引时应新增迁移
+_MAX_TOKEN_LENGTH = 32
+_SPACE_MARK = "\u2423"
+
+
+def _normalize(text):
+    return (text or "").lower()
+
+
+def _char_ngrams(text):
+    text = text.replace(" ", _SPACE_MARK)
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _pinyin_syllables(text):
+    return [_normalize(s).strip() for s in lazy_pinyin(text or "") if s.strip()]
+
+
+def _pinyin_initials(text):
+    return "".join(
+        ch for ch in _normalize("".join(lazy_pinyin(text or "", style=Style.FIRST_LETTER)))
+        if ch.isalnum()
+    )
+
+
+def _prefixed(prefix, values):
+    return {prefix + v for v in values if v and len(prefix + v) <= _MAX_TOKEN_LENGTH}
+
+
+def _shop_tokens(name, category, name_pinyin, category_pinyin):
+    tokens = set()
+    for field in (name, category, name_pinyin, category_pinyin):
+        tokens |= _prefixed("g:", _char_ngrams(_normalize(field)))
+    tokens |= _prefixed("s:", _pinyin_syllables(name) + _pinyin_syllables(category))
+    tokens |= _prefixed("i:", _char_ngrams(_pinyin_initials(name)))
+    return tokens
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'shop_search_tokens',
+        sa.Column('token', sa.String(length=32, collation='utf8mb4_bin'), nullable=False),
+        sa.Column('shop_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['shop_id'], ['shops.id']),
+        sa.PrimaryKeyConstraint('token', 'shop_id')
+    )
+    op.create_index(op.f('ix_shop_search_tokens_shop_id'), 'shop_search_tokens', ['shop_id'], unique=False)
+
+    # 为已有店铺回填词项
+    conn = op.get_bind()
+    shops = conn.execute(text("SELECT id, name, category, name_pinyin, category_pinyin FROM shops")).fetchall()
+    for shop in shops:
+        tokens = _shop_tokens(shop.name, shop.category, shop.name_pinyin, shop.category_pinyin)
+        if tokens:
+            conn.execute(
+                text("INSERT INTO shop_search_tokens (token, shop_id) VALUES (:token, :shop_id)"),
+                [{"token": token, "shop_id": shop.id} for token in tokens]
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_shop_search_tokens_shop_id'), table_name='shop_search_tokens')
+    op.drop_table('shop_search_tokens')
@@ -0,0 +1,115 @@
+"""Add unspaced full pinyin and initials columns to shops
+
+Revision ID: c4e9b1f7a2d8
+Revises: a83f2c6d1e57
+Create Date: 2026-10-18 11:20:05.104377
+
+"""
+from typing import Sequence, Union
+
+from sqlalchemy.sql import text
+from alembic import op
+import sqlalchemy as sa
+from pypinyin import lazy_pinyin, Style
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e9b1f7a2d8'
+down_revision: Union[str, None] = 'a83f2c6d1e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 回填使用的分词规则冻结在本迁移中（与编写本迁移时的 backend.tokenizer 一致），
+# 之后修改分词规则不会改变本迁移的结果；需要按新规则重建索引时应新增迁移
+_MAX_TOKEN_LENGTH = 32
+_SPACE_MARK = "\u2423"
+
+
+def _normalize(text):
+    return (text or "").lower()
+
+
+def _char_ngrams(text):
+    text = text.replace(" ", _SPACE_MARK)
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _pinyin_syllables(text):
+    return [_normalize(s).strip() for s in lazy_pinyin(text or "") if s.strip()]
+
+
+def _pinyin_initials(text):
+    return "".join(
+        ch for ch in _normalize("".join(lazy_pinyin(text or "", style=Style.FIRST_LETTER)))
+        if ch.isalnum()
+    )
+
+
+def _prefixed(prefix, values):
+    return {prefix + v for v in values if v and len(prefix + v) <= _MAX_TOKEN_LENGTH}
+
+
+def _pinyin_full(text):
+    return "".join(ch for ch in _normalize("".join(lazy_pinyin(text or ""))) if ch.isalnum())
+
+
+def _shop_tokens(name, category, name_pinyin, category_pinyin):
+    tokens = set()
+    for field in (name, category, name_pinyin, category_pinyin):
+        tokens |= _prefixed("g:", _char_ngrams(_normalize(field)))
+    tokens |= _prefixed("s:", _pinyin_syllables(name) + _pinyin_syllables(category))
+    for field in (name, category):
+        tokens |= _prefixed("i:", _char_ngrams(_pinyin_initials(field)))
+        tokens |= _prefixed("f:", _char_ngrams(_pinyin_full(field)))
+    return tokens
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('name_pinyin_full', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('name_initials', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('category_pinyin_full', sa.String(length=150), nullable=True))
+        batch_op.add_column(sa.Column('category_initials', sa.String(length=50), nullable=True))
+        batch_op.create_index(batch_op.f('ix_shops_name_pinyin_full'), ['name_pinyin_full'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shops_name_initials'), ['name_initials'], unique=False)
+
+    # 回填拼音列，并按新的分词规则重建倒排索引（新增 "f:" 词项与品类首字母词项）
+    conn = op.get_bind()
+    conn.execute(text("DELETE FROM shop_search_tokens"))
+    shops = conn.execute(text("SELECT id, name, category, name_pinyin, category_pinyin FROM shops")).fetchall()
+    for shop in shops:
+        conn.execute(
+            text(
+                "UPDATE shops SET name_pinyin_full = :name_full, name_initials = :name_initials, "
+                "category_pinyin_full = :category_full, category_initials = :category_initials "
+                "WHERE id = :shop_id"
+            ),
+            {
+                "name_full": _pinyin_full(shop.name)[:255],
+                "name_initials": _pinyin_initials(shop.name)[:100],
+                "category_full": _pinyin_full(shop.category)[:150],
+                "category_initials": _pinyin_initials(shop.category)[:50],
+                "shop_id": shop.id
+            }
+        )
+        tokens = _shop_tokens(shop.name, shop.category, shop.name_pinyin, shop.category_pinyin)
+        if tokens:
+            conn.execute(
+                text("INSERT INTO shop_search_tokens (token, shop_id) VALUES (:token, :shop_id)"),
+                [{"token": token, "shop_id": shop.id} for token in tokens]
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shops_name_initials'))
+        batch_op.drop_index(batch_op.f('ix_shops_name_pinyin_full'))
+        batch_op.drop_column('category_initials')
+        batch_op.drop_column('category_pinyin_full')
+        batch_op.drop_column('name_initials')
+        batch_op.drop_column('name_pinyin_full')
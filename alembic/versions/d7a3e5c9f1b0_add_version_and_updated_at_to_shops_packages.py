@@ -0,0 +1,51 @@
+"""Add version and updated_at columns to shops and packages
+
+Revision ID: d7a3e5c9f1b0
+Revises: c4e9b1f7a2d8
+Create Date: 2026-10-18 15:02:47.530114
+
+"""
+from typing import Sequence, Union
+
+from sqlalchemy.sql import text
+from sqlalchemy.dialects import mysql
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e5c9f1b0'
+down_revision: Union[str, None] = 'c4e9b1f7a2d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PreciseDateTime = sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('updated_at', PreciseDateTime, nullable=True))
+        batch_op.create_index(batch_op.f('ix_shops_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('updated_at', PreciseDateTime, nullable=True))
+
+    # 回填已有数据的最后修改时间
+    conn = op.get_bind()
+    conn.execute(text("UPDATE shops SET updated_at = UTC_TIMESTAMP(6) WHERE updated_at IS NULL"))
+    conn.execute(text("UPDATE packages SET updated_at = UTC_TIMESTAMP(6) WHERE updated_at IS NULL"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('shops', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_shops_updated_at'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('version')
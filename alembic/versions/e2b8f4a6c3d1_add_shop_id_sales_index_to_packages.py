@@ -0,0 +1,30 @@
+"""Add (shop_id, sales) index to packages
+
+Revision ID: e2b8f4a6c3d1
+Revises: d7a3e5c9f1b0
+Create Date: 2026-10-18 16:24:09.117352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8f4a6c3d1'
+down_revision: Union[str, None] = 'd7a3e5c9f1b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.create_index('ix_packages_shop_id_sales', ['shop_id', 'sales'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('packages', schema=None) as batch_op:
+        batch_op.drop_index('ix_packages_shop_id_sales')
@@ -0,0 +1,58 @@
+"""Add order_outbox and order_event_deliveries tables
+
+Revision ID: f3c9a1d7b5e2
+Revises: e2b8f4a6c3d1
+Create Date: 2026-10-18 17:41:55.802936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9a1d7b5e2'
+down_revision: Union[str, None] = 'e2b8f4a6c3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'order_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_outbox_id'), 'order_outbox', ['id'], unique=False)
+    op.create_index('ix_order_outbox_status_available_at', 'order_outbox', ['status', 'available_at'], unique=False)
+
+    op.create_table(
+        'order_event_deliveries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('observer', sa.String(length=100), nullable=False),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['event_id'], ['order_outbox.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('event_id', 'observer', name='uq_order_event_deliveries_event_observer')
+    )
+    op.create_index(op.f('ix_order_event_deliveries_id'), 'order_event_deliveries', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_order_event_deliveries_id'), table_name='order_event_deliveries')
+    op.drop_table('order_event_deliveries')
+    op.drop_index('ix_order_outbox_status_available_at', table_name='order_outbox')
+    op.drop_index(op.f('ix_order_outbox_id'), table_name='order_outbox')
+    op.drop_table('order_outbox')
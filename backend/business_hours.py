@@ -0,0 +1,48 @@
+"""
+营业时间解析模块。
+将 "HH:MM-HH:MM" 格式的营业时间字符串解析为当天的分钟数（0-1439），
+店铺写入时预先计算并存入 open_minute / close_minute 列，
+使 "当前是否营业" 可以直接作为 SQL 条件在数据库中过滤。
+"""
+from datetime import datetime
+from typing import Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_clock(value: str) -> int:
+    hour, minute = map(int, value.strip().split(':'))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"invalid clock value '{value}'")
+    return hour * 60 + minute
+
+
+def parse_business_hours(business_hours: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    解析营业时间字符串，返回 (开门分钟数, 关门分钟数)。
+    跨夜营业（如 "18:00-02:00"）时关门分钟数小于开门分钟数。
+    无法解析时返回 None。
+    """
+    if not business_hours:
+        return None
+    try:
+        open_str, close_str = business_hours.split('-')
+        return _parse_clock(open_str), _parse_clock(close_str)
+    except ValueError:
+        return None
+
+
+def minute_of_day(current_time: datetime) -> int:
+    """
+    返回给定时间在当天的分钟数。
+    """
+    return current_time.hour * 60 + current_time.minute
+
+
+def is_open_at(open_minute: int, close_minute: int, minute: int) -> bool:
+    """
+    判断给定分钟数是否处于营业区间内（含首尾，支持跨夜）。
+    """
+    if close_minute < open_minute:
+        return minute >= open_minute or minute <= close_minute
+    return open_minute <= minute <= close_minute
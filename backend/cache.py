@@ -0,0 +1,209 @@
+"""
+店铺 / 套餐详情的读穿缓存。
+- CacheBackend：可插拔的缓存后端接口，默认进程内 LRU + TTL（MemoryLRUCache），
+  设置环境变量 CACHE_BACKEND=redis 时使用 Redis（需安装 redis 包）。
+- DetailCache：按命名空间读穿缓存并统计命中 / 未命中次数；作为目录观察者，
+  店铺、套餐变更提交后删除对应的缓存键。
+缓存值为可 JSON 序列化的 dict / list，调用方不得修改。
+"""
+import asyncio
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+from backend.catalog_events import CatalogObserver
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+load_dotenv()
+
+
+class CacheBackend(ABC):
+    """
+    缓存后端接口，get 返回 None 表示未命中。
+    """
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float):
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        pass
+
+    def invalidate(self, *keys: str):
+        """
+        在同步上下文（事务提交回调）中删除缓存键。
+        AsyncSession 的提交回调运行在 SQLAlchemy 的 greenlet 中，此时直接等待删除完成，
+        commit 返回时缓存已删除，随后的请求不会读到旧值；
+        其他上下文中没有运行的事件循环时同步执行，否则只能调度为后台任务。删除失败时打印日志。
+        """
+        if in_greenlet():
+            await_only(self._delete_logged(keys))
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._delete_logged(keys))
+            return
+        task = loop.create_task(self._delete_logged(keys))
+        _pending_tasks.add(task)
+        task.add_done_callback(_pending_tasks.discard)
+
+    async def _delete_logged(self, keys):
+        try:
+            await self.delete(*keys)
+        except Exception as e:
+            # 删除失败时旧值最多保留到 TTL 过期
+            print(f"Failed to invalidate cache keys {list(keys)}: {e}")
+
+
+# 持有尚未完成的失效任务，避免被垃圾回收
+_pending_tasks: set = set()
+
+
+class MemoryLRUCache(CacheBackend):
+    def __init__(self, max_entries: int = 4096):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str):
+        self.invalidate(*keys)
+
+    def invalidate(self, *keys: str):
+        # 进程内缓存直接同步删除，提交后立即生效
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    def __init__(self, url: str, prefix: str = "dianping:"):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = aioredis.from_url(url)
+        self._prefix = prefix
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._client.set(self._prefix + key, json.dumps(value, default=str), px=int(ttl * 1000))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self._client.delete(*(self._prefix + key for key in keys))
+
+
+def create_cache_backend() -> CacheBackend:
+    """
+    根据环境变量创建缓存后端。
+    """
+    if os.getenv("CACHE_BACKEND", "memory") == "redis":
+        return RedisCache(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+    return MemoryLRUCache(int(os.getenv("CACHE_MAX_ENTRIES", "4096")))
+
+
+class DetailCache(CatalogObserver):
+    def __init__(self, backend: CacheBackend, ttl: float = 300.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        # 正在加载的键 -> 进行中的加载数，以及这些键在加载期间的失效次数。
+        # 只有与同一个键的失效并发的加载不回填（避免把提交前读到的旧值写回缓存），其他键的加载不受影响；
+        # 没有进行中的加载时不记录失效次数，字典大小不随失效次数增长
+        self._loading: Counter = Counter()
+        self._invalidations: Counter = Counter()
+
+    async def get_or_load(self, namespace: str, key_id: Any, loader: Callable[[], Awaitable[Optional[Any]]]) -> Optional[Any]:
+        """
+        读穿缓存：命中直接返回，否则调用 loader 加载并回填（loader 返回 None 时不缓存）。
+        """
+        key = f"{namespace}:{key_id}"
+        value = await self.backend.get(key)
+        if value is not None:
+            self.hits[namespace] += 1
+            return value
+
+        self.misses[namespace] += 1
+        self._loading[key] += 1
+        invalidations = self._invalidations[key]
+        try:
+            value = await loader()
+        finally:
+            stale = self._invalidations[key] != invalidations
+            self._loading[key] -= 1
+            if not self._loading[key]:
+                del self._loading[key]
+                self._invalidations.pop(key, None)
+        if value is not None and not stale:
+            await self.backend.set(key, value, self.ttl)
+        return value
+
+    def invalidate(self, *keys: str):
+        for key in keys:
+            if key in self._loading:
+                self._invalidations[key] += 1
+        self.backend.invalidate(*keys)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for namespace in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[namespace], self.misses[namespace]
+            stats[namespace] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+            }
+        return stats
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self.invalidate(f"shop:{shop['id']}")
+
+    def on_shop_deleted(self, shop_id: int):
+        self.invalidate(f"shop:{shop_id}")
+
+    def on_shop_images_changed(self, shop_id: int):
+        # 图片变更会递增店铺版本号
+        self.invalidate(f"shop:{shop_id}")
+
+    def on_package_changed(self, package: Dict[str, Any]):
+        self.invalidate(f"package:{package['id']}")
+
+    def on_package_deleted(self, package: Dict[str, Any]):
+        self.on_package_changed(package)
+
+
+# 进程内单例
+detail_cache = DetailCache(create_cache_backend())
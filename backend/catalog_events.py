@@ -0,0 +1,77 @@
+"""
+商品目录变更通知模块（观察者模式）。
+店铺、套餐写入时由 models 中的 ORM 事件登记变更快照，
+事务提交后再统一通知已注册的观察者（回滚时丢弃），
+供联想词索引、缓存等进程内结构增量刷新。
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+
+_PENDING_KEY = "catalog_changes"
+
+
+class CatalogObserver:
+    """
+    目录变更观察者基类，按需覆盖对应方法。
+    """
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        pass
+
+    def on_shop_deleted(self, shop_id: int):
+        pass
+
+    def on_shop_images_changed(self, shop_id: int):
+        pass
+
+    def on_package_changed(self, package: Dict[str, Any]):
+        pass
+
+    def on_package_deleted(self, package: Dict[str, Any]):
+        pass
+
+
+# 注册的观察者列表
+_observers: List[CatalogObserver] = []
+
+
+def register_catalog_observer(observer: CatalogObserver):
+    """
+    注册一个目录变更观察者。
+    """
+    _observers.append(observer)
+
+
+def unregister_catalog_observer(observer: CatalogObserver):
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def mark_changed(session: Session, method: str, payload: Any):
+    """
+    在会话中登记一条待通知的变更，事务提交后调用各观察者的 method 方法。
+    """
+    session.info.setdefault(_PENDING_KEY, []).append((method, payload))
+
+
+def notify(method: str, payload: Any):
+    """
+    立即通知所有观察者。
+    """
+    for obs in _observers:
+        try:
+            getattr(obs, method)(payload)
+        except Exception as e:
+            # 某个观察者失败时打印日志，不影响其他观察者执行
+            print(f"目录观察者 {obs.__class__.__name__} 执行失败: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending_changes(session: Session):
+    for method, payload in session.info.pop(_PENDING_KEY, []):
+        notify(method, payload)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session: Session):
+    session.info.pop(_PENDING_KEY, None)
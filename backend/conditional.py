@@ -0,0 +1,51 @@
+"""
+HTTP 条件请求（ETag / Last-Modified）。
+弱 ETag 由行版本号（version）等廉价的校验信息计算，不依赖响应体；
+客户端携带的 If-None-Match 匹配时直接返回 304，跳过查询与序列化。
+"""
+import datetime
+import hashlib
+from email.utils import format_datetime
+from typing import Any, Optional
+from fastapi import Request, Response
+
+
+def weak_etag(*parts: Any) -> str:
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def http_date(value: Optional[datetime.datetime]) -> Optional[str]:
+    """
+    数据库中的时间均为 UTC（naive），格式化为 HTTP 日期。
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return format_datetime(value.astimezone(datetime.timezone.utc), usegmt=True)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    弱比较：忽略 W/ 前缀，支持逗号分隔的多个值与 *。
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime.datetime] = None):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+
+
+def not_modified(etag: str, last_modified: Optional[datetime.datetime] = None) -> Response:
+    response = Response(status_code=304)
+    set_validators(response, etag, last_modified)
+    return response
@@ -1,13 +1,61 @@
 from fastapi import APIRouter, Query, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
-from backend.database import get_db
 from sqlalchemy.future import select
+from backend.database import get_db, async_session
 from backend.models import Shop  # 替换为 Shop 模型
 from backend.schema import Shop as ShopSchema  # 导入 Pydantic 模型
+from backend.shop_catalog import shop_catalog, load_shops_in_order
 
 router = APIRouter()
 
+# NDJSON 导出时每批从服务端游标读取并写出的行数
+NDJSON_CHUNK_SIZE = 500
+
+def stream_shops_ndjson(query) -> StreamingResponse:
+    """
+    以 NDJSON 流式返回查询结果：通过服务端游标分批读取，逐批序列化写出，内存占用与表大小无关。
+    流式响应在依赖项清理之后才发送，因此使用独立的会话。
+    """
+    async def generate():
+        async with async_session() as db:
+            result = await db.stream_scalars(query.execution_options(yield_per=NDJSON_CHUNK_SIZE))
+            async for shops in result.partitions():
+                yield "".join(ShopSchema.model_validate(shop).model_dump_json() + "\n" for shop in shops)
+                # 已写出的对象不再保留在会话中
+                db.expunge_all()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+def filter_shops_query(rating, cost_min, cost_max):
+    """
+    与列式快照筛选语义一致的 SQL 查询：id 升序。
+    """
+    filters = []
+    if rating:
+        filters.append(Shop.rating >= rating)
+    if cost_min:
+        filters.append(Shop.avg_cost >= cost_min)
+    if cost_max:
+        filters.append(Shop.avg_cost <= cost_max)
+    query = select(Shop).order_by(Shop.id.asc())
+    if filters:
+        query = query.filter(and_(*filters))
+    return query
+
+def sort_shops_query(sort_by: str):
+    """
+    与列式快照排序语义一致的 SQL 查询：同值按 id 升序。
+    """
+    if sort_by == "rating":
+        order = [Shop.rating.desc(), Shop.id.asc()]
+    elif sort_by == "avg_spend":
+        order = [Shop.avg_cost.asc(), Shop.id.asc()]  # avg_spend 替换为 avg_cost
+    else:
+        order = [Shop.id.desc()]
+    return select(Shop).order_by(*order)
+
 @router.get("/filter", response_model=list[ShopSchema])
 async def filter_shops(
     rating: float = Query(None, gt=0.0, le=5.0),
@@ -15,45 +63,53 @@ async def filter_shops(
     price_max: float = Query(None, gt=0),
     avg_spend_min: float = Query(None, gt=0),
     avg_spend_max: float = Query(None, gt=0),
+    limit: int = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    format: str = Query('json', regex="^(json|ndjson)$"),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Shop)  # 使用 Shop 模型
-    
-    filters = []
-    if rating:
-        filters.append(Shop.rating >= rating)
-    if price_min:
-        # Shop 模型中没有 price 字段，使用 avg_cost 替代
-        filters.append(Shop.avg_cost >= price_min)
-    if price_max:
-        filters.append(Shop.avg_cost <= price_max)
-    if avg_spend_min:
-        filters.append(Shop.avg_cost >= avg_spend_min)
-    if avg_spend_max:
-        filters.append(Shop.avg_cost <= avg_spend_max)
+    # Shop 模型中没有 price 字段，使用 avg_cost 替代
+    cost_mins = [v for v in (price_min, avg_spend_min) if v]
+    cost_maxs = [v for v in (price_max, avg_spend_max) if v]
+    cost_min = max(cost_mins) if cost_mins else None
+    cost_max = min(cost_maxs) if cost_maxs else None
 
-    if filters:
-        query = query.filter(and_(*filters))
+    query = filter_shops_query(rating, cost_min, cost_max).offset(offset).limit(limit)
+    if format == 'ndjson':
+        return stream_shops_ndjson(query)
+    if limit is None:
+        # 未指定 limit 时返回全部匹配行，直接顺序读取，不把所有 ID 拼成 IN 列表回表
+        result = await db.execute(query)
+        return result.scalars().all()
 
-    result = await db.execute(query)
-    shops = result.scalars().all()
-    return shops
+    # 数值筛选由列式快照向量化完成，只回表读取当前页
+    await shop_catalog.ensure_fresh(db)
+    shop_ids = shop_catalog.filter_ids(
+        rating=rating or None,
+        cost_min=cost_min,
+        cost_max=cost_max,
+        offset=offset,
+        limit=limit
+    )
+    return await load_shops_in_order(db, shop_ids)
 
 @router.get("/sort", response_model=list[ShopSchema])
 async def sort_shops(
     sort_by: str = Query('default', regex="^(default|rating|avg_spend)$"),
+    limit: int = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    format: str = Query('json', regex="^(json|ndjson)$"),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Shop)  # 使用 Shop 模型
-    
-    if sort_by == "rating":
-        query = query.order_by(Shop.rating.desc())
-    elif sort_by == "avg_spend":
-        query = query.order_by(Shop.avg_cost.asc())  # avg_spend 替换为 avg_cost
-    else:
-        # Shop 模型中没有 created_at 字段，改为按 id 排序
-        query = query.order_by(Shop.id.desc())
-    
-    result = await db.execute(query)
-    shops = result.scalars().all()
-    return shops
\ No newline at end of file
+    query = sort_shops_query(sort_by).offset(offset).limit(limit)
+    if format == 'ndjson':
+        return stream_shops_ndjson(query)
+    if limit is None:
+        # 未指定 limit 时返回全部店铺，直接按顺序读取，不把所有 ID 拼成 IN 列表回表
+        result = await db.execute(query)
+        return result.scalars().all()
+
+    # rating 降序、avg_spend（avg_cost）升序、默认按 id 降序，均使用预排序的置换数组
+    await shop_catalog.ensure_fresh(db)
+    shop_ids = shop_catalog.sorted_ids(sort_by, offset=offset, limit=limit)
+    return await load_shops_in_order(db, shop_ids)
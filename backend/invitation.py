@@ -68,10 +68,14 @@ async def get_invitation_records(
         "total_invited": len(records)
     }
 
-async def record_invitation(db: AsyncSession, order: Order, inviter_id: int, invited_user_id: int):
+async def record_invitation(db: AsyncSession, order: Order, inviter_id: int, invited_user_id: int) -> bool:
+    """
+    在下单事务内写入邀请记录（不提交），返回是否新增了记录；
+    奖励券由调用方在事务提交后通过 award_invitation_coupon 发放。
+    """
     # 检查订单金额是否满足条件
     if order.order_amount <= 10:
-        return
+        return False
     
     # 检查是否已有有效邀请记录
     existing_record = await db.execute(
@@ -81,7 +85,7 @@ async def record_invitation(db: AsyncSession, order: Order, inviter_id: int, inv
         )
     )
     if existing_record.scalar():
-        return
+        return False
         
     # 创建新记录
     record = InvitationRecord(
@@ -93,10 +97,8 @@ async def record_invitation(db: AsyncSession, order: Order, inviter_id: int, inv
         is_valid=True
     )
     db.add(record)
-    await db.commit()
-    
-    # 触发奖励
-    await award_invitation_coupon(db, inviter_id)
+    await db.flush()
+    return True
 
 async def award_invitation_coupon(db: AsyncSession, inviter_id: int):
     try:
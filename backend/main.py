@@ -38,6 +38,10 @@ app.mount("/", StaticFiles(directory="frontend"), name="static")
 
 @app.on_event("startup")
 async def startup():
+    # 券码置换密钥缺失时拒绝启动
+    from backend.voucher_codes import voucher_code_generator
+    voucher_code_generator.check_secret()
+
     # 自动运行 Alembic 迁移
     subprocess.run(["alembic", "upgrade", "head"])
     print("Starting database initialization...")
@@ -50,8 +54,50 @@ async def startup():
         PackageSalesObserver,
         CouponUsageObserver
     )
-    register_observer(PackageSalesObserver())  # 订单创建后更新销量
-    register_observer(CouponUsageObserver())   # 订单创建后更新券状态
+    register_observer(PackageSalesObserver())  # 订单创建后更新销量（经发件箱异步执行）
+    register_observer(CouponUsageObserver())   # 订单创建后更新券状态（下单事务内同步执行）
+
+    # 启动订单事件发件箱投递任务
+    from backend.order_outbox import order_outbox_worker
+    order_outbox_worker.start()
+
+    # 构建搜索联想索引，并在店铺、套餐变更后增量刷新
+    from backend.database import async_session
+    from backend.catalog_events import register_catalog_observer
+    from backend.suggest import suggest_index
+    from backend.shop_counts import shop_count_cache, shop_histogram
+    async with async_session() as db:
+        await suggest_index.build(db)
+        await shop_histogram.build(db)
+    register_catalog_observer(suggest_index)
+    # 店铺变更时清空搜索总数缓存、增量更新直方图
+    register_catalog_observer(shop_count_cache)
+    register_catalog_observer(shop_histogram)
+    # 店铺变更后列式快照标记为过期，下次筛选/排序时重新加载
+    from backend.shop_catalog import shop_catalog
+    register_catalog_observer(shop_catalog)
+    # 店铺图片变更后失效对应店铺的图片分页缓存
+    from backend.shop_images import shop_image_cache
+    register_catalog_observer(shop_image_cache)
+    # 店铺、套餐变更后删除对应的详情缓存（包括下单后的销量更新）
+    from backend.cache import detail_cache
+    register_catalog_observer(detail_cache)
+    # 店铺或图片变更后递增目录版本号，使搜索响应缓存失效
+    from backend.search_cache import search_response_cache
+    register_catalog_observer(search_response_cache)
+
+    # 启动搜索历史批量写入任务
+    from backend.search_history import search_history_buffer
+    search_history_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 停止后台任务前写入剩余的搜索历史
+    from backend.search_history import search_history_buffer
+    await search_history_buffer.stop()
+    # 停止订单事件投递，未处理完的事件在下次启动后重新领取
+    from backend.order_outbox import order_outbox_worker
+    await order_outbox_worker.stop()
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
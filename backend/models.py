@@ -1,12 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Float, DateTime, Enum, ForeignKey, Boolean, Index, UniqueConstraint, event, inspect
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import relationship, object_session
+from backend.catalog_events import mark_changed
+from backend.business_hours import parse_business_hours
+from backend.tokenizer import pinyin_full, pinyin_initials
 import datetime
 import enum
 
 
 Base = declarative_base()
 
+# 微秒精度的时间戳（MySQL 默认 DATETIME 只精确到秒），用于生成 ETag / Last-Modified
+PreciseDateTime = DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
 # 枚举类型定义
 class DiscountType(enum.Enum):
     deduction = "deduction"  # 减固定金额（如满100减20）
@@ -46,6 +53,111 @@ class Shop(Base):
     phone = Column(String(20))
     business_hours = Column(String(50))
     image_url = Column(String(255), nullable=True)
+    # 由名称、品类派生的无空格全拼与拼音首字母，用于拼音/缩写搜索
+    name_pinyin_full = Column(String(255), index=True)
+    name_initials = Column(String(100), index=True)
+    category_pinyin_full = Column(String(150))
+    category_initials = Column(String(50))
+    # 由 business_hours 预解析得到的营业时间（当天分钟数），用于 SQL 过滤营业中店铺
+    open_minute = Column(Integer, nullable=True)
+    close_minute = Column(Integer, nullable=True)
+    # 行版本号与最后修改时间，每次更新递增，用于 HTTP 条件请求
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(PreciseDateTime, default=datetime.datetime.utcnow, index=True)
+
+    __table_args__ = (
+        Index('ix_shops_open_close_minute', 'open_minute', 'close_minute'),
+    )
+
+@event.listens_for(Shop, 'before_insert')
+@event.listens_for(Shop, 'before_update')
+def _fill_shop_derived_columns(mapper, connection, target):
+    """
+    店铺写入前根据原始字段计算派生列。
+    """
+    hours = parse_business_hours(target.business_hours)
+    target.open_minute, target.close_minute = hours if hours else (None, None)
+
+    target.name_pinyin_full = pinyin_full(target.name)[:255]
+    target.name_initials = pinyin_initials(target.name)[:100]
+    target.category_pinyin_full = pinyin_full(target.category)[:150]
+    target.category_initials = pinyin_initials(target.category)[:50]
+
+class ShopSearchToken(Base):
+    """
+    店铺搜索倒排索引：每行表示一个词项命中一个店铺（posting list 按 token 聚簇存储）。
+    """
+    __tablename__ = 'shop_search_tokens'
+    token = Column(String(32).with_variant(String(32, collation='utf8mb4_bin'), 'mysql'), primary_key=True)
+    shop_id = Column(Integer, ForeignKey('shops.id'), primary_key=True, index=True)
+
+@event.listens_for(Shop, 'after_insert')
+def _index_new_shop(mapper, connection, target):
+    from backend.search_index import sync_shop_tokens  # 防止循环引用
+    sync_shop_tokens(connection, target)
+
+@event.listens_for(Shop, 'after_update')
+def _reindex_updated_shop(mapper, connection, target):
+    from backend.search_index import sync_shop_tokens, INDEXED_FIELDS  # 防止循环引用
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS):
+        sync_shop_tokens(connection, target)
+
+@event.listens_for(Shop, 'before_delete')
+def _unindex_deleted_shop(mapper, connection, target):
+    from backend.search_index import remove_shop_tokens  # 防止循环引用
+    remove_shop_tokens(connection, target.id)
+
+class CatalogVersion(Base):
+    """
+    目录版本戳：店铺或店铺图片每次变更时在数据库中递增，用作搜索响应 ETag 的一部分（多进程间一致）。
+    """
+    __tablename__ = 'catalog_versions'
+    name = Column(String(32), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+def bump_catalog_version(connection, name: str = "shops"):
+    """
+    在当前事务中递增目录版本（SQL 端自增，不做读改写）。
+    版本行由迁移预先写入；直接建表（测试环境）时首次递增补写该行。
+    """
+    versions = CatalogVersion.__table__
+    result = connection.execute(
+        versions.update().where(versions.c.name == name).values(version=versions.c.version + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(versions.insert().values(name=name, version=1))
+
+@event.listens_for(Shop, 'after_insert')
+@event.listens_for(Shop, 'after_delete')
+def _bump_catalog_on_shop_write(mapper, connection, target):
+    bump_catalog_version(connection)
+
+@event.listens_for(Shop, 'after_update')
+def _bump_catalog_on_shop_update(mapper, connection, target):
+    if object_session(target).is_modified(target, include_collections=False):
+        bump_catalog_version(connection)
+
+def _snapshot(mapper, target) -> dict:
+    """
+    复制目标对象的列值，供事务提交后通知目录观察者。
+    version 在 SQL 中自增，写入后过期，不包含在快照中，避免在 flush 中回查数据库。
+    """
+    unloaded = inspect(target).unloaded
+    return {
+        attr.key: getattr(target, attr.key)
+        for attr in mapper.column_attrs
+        if not (attr.key == "version" and attr.key in unloaded)
+    }
+
+@event.listens_for(Shop, 'after_insert')
+@event.listens_for(Shop, 'after_update')
+def _mark_shop_changed(mapper, connection, target):
+    mark_changed(object_session(target), "on_shop_changed", _snapshot(mapper, target))
+
+@event.listens_for(Shop, 'after_delete')
+def _mark_shop_deleted(mapper, connection, target):
+    mark_changed(object_session(target), "on_shop_deleted", target.id)
 
 class SearchHistory(Base):
     __tablename__ = 'search_history'
@@ -60,6 +172,24 @@ class ShopImage(Base):
     shop_id = Column(Integer, ForeignKey('shops.id'), nullable=False)
     image_url = Column(String(255), nullable=False)
 
+@event.listens_for(ShopImage, 'after_insert')
+@event.listens_for(ShopImage, 'after_update')
+@event.listens_for(ShopImage, 'after_delete')
+def _mark_shop_images_changed(mapper, connection, target):
+    session = object_session(target)
+    # 图片改挂到其他店铺时，原店铺的图片列表同样失效
+    shop_ids = {target.shop_id, *inspect(target).attrs.shop_id.history.deleted}
+    # 店铺详情包含图片，图片变更同时递增所属店铺的版本号
+    shops = Shop.__table__
+    connection.execute(
+        shops.update()
+        .where(shops.c.id.in_(shop_ids))
+        .values(version=shops.c.version + 1, updated_at=datetime.datetime.utcnow())
+    )
+    bump_catalog_version(connection)
+    for shop_id in shop_ids:
+        mark_changed(session, "on_shop_images_changed", shop_id)
+
 class Package(Base):
     __tablename__ = 'packages'
     id = Column(Integer, primary_key=True, index=True)
@@ -69,6 +199,32 @@ class Package(Base):
     contents = Column(String(255), nullable=False)  # 例如 "汉堡*2+可乐*2"
     sales = Column(Integer, default=0)
     shop_id = Column(Integer, ForeignKey('shops.id'), nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    updated_at = Column(PreciseDateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        # 店铺套餐按销量排序与每店热销套餐查询
+        Index('ix_packages_shop_id_sales', 'shop_id', 'sales'),
+    )
+
+@event.listens_for(Shop, 'before_update')
+@event.listens_for(Package, 'before_update')
+def _bump_row_version(mapper, connection, target):
+    # before_update 对所有脏对象触发，只有列值确实变化时才递增版本。
+    # 版本号在 SQL 中自增（version = version + 1），并发更新同一行时不会丢失递增；
+    # 写入后该属性过期，下次访问时从数据库重新读取
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = mapper.columns.version + 1
+        target.updated_at = datetime.datetime.utcnow()
+
+@event.listens_for(Package, 'after_insert')
+@event.listens_for(Package, 'after_update')
+def _mark_package_changed(mapper, connection, target):
+    mark_changed(object_session(target), "on_package_changed", _snapshot(mapper, target))
+
+@event.listens_for(Package, 'after_delete')
+def _mark_package_deleted(mapper, connection, target):
+    mark_changed(object_session(target), "on_package_deleted", _snapshot(mapper, target))
 
 class Coupon(Base):
     __tablename__ = 'coupons'
@@ -108,6 +264,81 @@ class Order(Base):
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     invitation_code = Column(String(6), nullable=True)  # 新增字段：邀请码
 
+    __table_args__ = (
+        # 用户订单列表按 (created_at, id) 倒序分页，索引覆盖筛选、排序与游标条件
+        Index('ix_orders_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_orders_coupon_id', 'coupon_id'),
+    )
+
+class UserOrderStats(Base):
+    """
+    用户订单汇总：在下单事务中维护，订单数、首单时间与累计消费按主键读取，无需扫描订单表。
+    """
+    __tablename__ = 'user_order_stats'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    first_order_at = Column(DateTime, nullable=True)
+    total_spent = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class OrderIdempotencyKey(Base):
+    """
+    下单幂等键：客户端通过 Idempotency-Key 请求头重试下单时，直接返回首次下单的响应。
+    """
+    __tablename__ = 'order_idempotency_keys'
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    idempotency_key = Column(String(64), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # 请求体摘要，同一个键不能用于不同的请求
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
+    response = Column(Text, nullable=False)  # 首次下单返回的 OrderCreated（JSON）
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'idempotency_key', name='uq_order_idempotency_keys_user_key'),
+    )
+
+class VoucherCodeSequence(Base):
+    """
+    券码序号：各进程按块领取序号，经置换生成券码（见 backend.voucher_codes）。
+    """
+    __tablename__ = 'voucher_code_sequences'
+    name = Column(String(32), primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=0)
+
+# ---------------- 订单事件发件箱 ---------------- #
+class OrderOutboxEvent(Base):
+    """
+    订单事件发件箱：与订单在同一事务中写入，由后台任务投递给异步观察者。
+    """
+    __tablename__ = 'order_outbox'
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey('orders.id'), nullable=False)
+    event_type = Column(String(50), nullable=False, default="order_created")
+    status = Column(String(20), nullable=False, default="pending")  # pending / done / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)  # 可被领取的时间（领取租约或重试退避）
+    last_error = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_order_outbox_status_available_at', 'status', 'available_at'),
+    )
+
+class OrderEventDelivery(Base):
+    """
+    事件投递记录（幂等键）：每个事件对每个观察者只成功处理一次。
+    """
+    __tablename__ = 'order_event_deliveries'
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey('order_outbox.id'), nullable=False)
+    observer = Column(String(100), nullable=False)
+    delivered_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('event_id', 'observer', name='uq_order_event_deliveries_event_observer'),
+    )
+
 # ---------------- 邀请码相关 ---------------- #
 class InvitationRecord(Base):
     __tablename__ = 'invitation_records'
@@ -0,0 +1,81 @@
+"""
+用户订单历史查询服务：GET /api/user/orders 的唯一查询路径。
+- 精简投影：只取列表展示的列（订单 ID、下单时间、套餐名、店铺名）。
+- 偏移分页：先在索引 ix_orders_user_id_created_at_id 上定位本页订单 ID，再只为本页关联套餐与店铺。
+- 游标分页：传入 cursor 时按 (created_at, id) 倒序的 keyset 条件定位下一页，深分页不再变慢。
+- 总数：从下单事务维护的用户订单汇总（user_order_stats）按主键读取，不再 count 订单表。
+"""
+from typing import Any, Dict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import Order, Package, Shop
+from backend.pagination import paginate_query, keyset_order_by
+from backend.user_order_stats import user_order_count
+
+# 用户订单列表排序键，与索引 ix_orders_user_id_created_at_id 一致
+USER_ORDER_KEYSET = [(Order.created_at, "desc"), (Order.id, "desc")]
+
+
+def user_orders_query(user_id: int):
+    """
+    用户订单列表的精简查询：只取列表展示的列，不加载完整的订单、套餐与店铺对象。
+    """
+    return (
+        select(
+            Order.id.label("order_id"),
+            Order.created_at,
+            Package.title.label("package_title"),
+            Shop.name.label("shop_name")
+        )
+        .join(Package, Order.package_id == Package.id)
+        .join(Shop, Package.shop_id == Shop.id)
+        .where(Order.user_id == user_id)
+        .order_by(*keyset_order_by(USER_ORDER_KEYSET))
+    )
+
+
+def user_orders_page_query(user_id: int, offset: int, limit: int):
+    """
+    偏移分页：先只在索引上定位本页订单 ID（索引已包含 user_id、created_at、id，无需回表），
+    再只为本页的行关联套餐与店铺。
+    """
+    page_ids = (
+        select(Order.id)
+        .where(Order.user_id == user_id)
+        .order_by(*keyset_order_by(USER_ORDER_KEYSET))
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    return user_orders_query(user_id).join(page_ids, Order.id == page_ids.c.id)
+
+
+async def fetch_user_orders(db: AsyncSession, user_id: int, page: int, page_size: int,
+                            cursor: str | None = None) -> Dict[str, Any]:
+    """
+    查询一页用户订单，返回 page、page_size、total、total_pages、next_cursor 与 data。
+    cursor 为 None 时按 page 偏移分页，否则使用游标分页（空字符串表示第一页）。
+    """
+    total = await user_order_count(db, user_id)
+
+    next_cursor = None
+    if cursor is not None:
+        result = await paginate_query(
+            db, user_orders_query(user_id), page, page_size, return_scalars=False,
+            cursor=cursor, keyset=USER_ORDER_KEYSET, id_fn=lambda row: row.order_id,
+            total=total
+        )
+        rows = result["data"]
+        next_cursor = result["next_cursor"]
+    else:
+        result = await db.execute(user_orders_page_query(user_id, (page - 1) * page_size, page_size))
+        rows = result.all()
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "total_pages": (total + page_size - 1) // page_size,
+        "next_cursor": next_cursor,
+        "data": [dict(row._mapping) for row in rows]
+    }
@@ -1,17 +1,36 @@
 """
 订单观察者模块（观察者模式）
 定义订单创建后的观察者响应逻辑，实现事件触发后的模块解耦处理。
+- 同步观察者（inline=True）在下单事务内执行，只写入会话、不提交，由 create_order 统一提交；
+- 其余观察者通过发件箱（order_outbox）异步执行：下单事务中只写入一条事件，
+  由 backend.order_outbox 的后台任务投递，失败自动重试。
 """
+import time
 from abc import ABC, abstractmethod
-from backend.models import Order, Package, UserCoupon, CouponStatus
+from datetime import datetime
+from backend.models import Order, Package, UserCoupon, CouponStatus, OrderOutboxEvent
+from backend.catalog_events import mark_changed
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update, insert, func
+from typing import List, Optional, Tuple, Type
+from backend.order_observers.metrics import observer_metrics
 
 class OrderObserver(ABC):
     """
     抽象观察者基类，所有订单事件观察者需继承并实现该接口。
+    inline 为 True 时在下单事务内同步执行，否则经发件箱异步执行；
+    timeout 为异步执行的超时时间（秒），为 None 时使用投递任务的默认值。
     """
+    inline: bool = False
+    timeout: Optional[float] = None
+
+    @property
+    def name(self) -> str:
+        """
+        观察者名称，作为投递记录的幂等键。
+        """
+        return self.__class__.__name__
+
     @abstractmethod
     async def on_order_created(self, order: Order, db: AsyncSession):
         """
@@ -22,19 +41,31 @@ class OrderObserver(ABC):
 class PackageSalesObserver(OrderObserver):
     """
     观察者：订单创建时更新套餐销量。
+    销量在数据库中原子自增，并发下单同一套餐时不会丢失计数，行锁只持有到本次投递提交。
     """
     async def on_order_created(self, order: Order, db: AsyncSession):
-        # 获取订单对应的套餐
-        package = await db.get(Package, order.package_id)
-        if package:
-            # 销量 +1
-            package.sales += 1
-            await db.commit()
+        packages = Package.__table__
+        result = await db.execute(
+            update(packages)
+            .where(packages.c.id == order.package_id)
+            .values(
+                sales=func.coalesce(packages.c.sales, 0) + 1,
+                version=packages.c.version + 1,
+                updated_at=datetime.utcnow()
+            )
+        )
+        if result.rowcount:
+            # 直接执行的 UPDATE 不触发 ORM 事件，手动登记变更，提交后刷新详情缓存与联想索引
+            row = (await db.execute(select(packages).where(packages.c.id == order.package_id))).mappings().one()
+            mark_changed(db.sync_session, "on_package_changed", dict(row))
 
 class CouponUsageObserver(OrderObserver):
     """
     观察者：订单使用优惠券后，将该用户券状态设置为已使用。
+    必须与订单同一事务提交，避免同一张券在异步处理前被重复使用。
     """
+    inline = True
+
     async def on_order_created(self, order: Order, db: AsyncSession):
         if order.coupon_id:
             # 查询该用户尚未使用的对应优惠券
@@ -46,7 +77,6 @@ class CouponUsageObserver(OrderObserver):
             user_coupon = result.scalars().first()
             if user_coupon:
                 user_coupon.status = CouponStatus.used
-                await db.commit()
 
 # 注册的观察者列表
 _observers: List[OrderObserver] = []
@@ -57,13 +87,53 @@ def register_observer(observer: OrderObserver):
     """
     _observers.append(observer)
 
+def outbox_observers() -> List[OrderObserver]:
+    """
+    经发件箱异步执行的观察者。
+    """
+    return [obs for obs in _observers if not obs.inline]
+
 async def notify_order_created(order: Order, db: AsyncSession):
     """
-    通知所有已注册的观察者：订单已创建。
+    通知所有已注册的观察者：订单已创建（需在订单 flush 之后、事务提交之前调用）。
+    同步观察者在独立的保存点中执行，失败时只回滚该观察者的写入，不影响订单与其他观察者；
+    异步观察者只在同一事务中写入发件箱事件。
     """
+    if outbox_observers():
+        db.add(OrderOutboxEvent(order_id=order.id, event_type="order_created"))
+
     for obs in _observers:
-        try:
+        if obs.inline:
+            await _run_inline_observer(obs, order, db)
+
+async def notify_orders_created(orders: List[Order], db: AsyncSession,
+                                handled: Tuple[Type[OrderObserver], ...] = ()):
+    """
+    批量下单后的通知：所有订单的发件箱事件用一条批量 INSERT 写入。
+    handled 中的同步观察者已由调用方对整批订单完成（如批量下单直接将已加载的用户券标记为已使用），
+    不再逐单执行；其余同步观察者与 notify_order_created 相同，逐单在保存点中执行。
+    """
+    if orders and outbox_observers():
+        await db.execute(
+            insert(OrderOutboxEvent),
+            [{"order_id": order.id, "event_type": "order_created"} for order in orders]
+        )
+
+    inline = [obs for obs in _observers if obs.inline and not isinstance(obs, handled)]
+    for order in orders:
+        for obs in inline:
+            await _run_inline_observer(obs, order, db)
+
+async def _run_inline_observer(obs: OrderObserver, order: Order, db: AsyncSession):
+    """
+    在独立的保存点中执行同步观察者，失败时只回滚该观察者的写入。
+    """
+    start = time.perf_counter()
+    try:
+        async with db.begin_nested():
             await obs.on_order_created(order, db)
-        except Exception as e:
-            # 某个观察者失败时打印日志，不影响其他观察者执行
-            print(f"观察者 {obs.__class__.__name__} 执行失败: {e}")
+        observer_metrics.observe(obs.name, time.perf_counter() - start)
+    except Exception as e:
+        observer_metrics.observe(obs.name, time.perf_counter() - start, "error")
+        # 某个观察者失败时打印日志，不影响其他观察者执行
+        print(f"观察者 {obs.__class__.__name__} 执行失败: {e}")
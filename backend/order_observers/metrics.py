@@ -0,0 +1,67 @@
+"""
+订单观察者耗时统计：按观察者记录累积分桶直方图（与 Prometheus histogram 的桶语义一致）及结果计数。
+"""
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, Sequence
+
+# 耗时分桶上界（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        for i, upper in enumerate(self.buckets):
+            if seconds <= upper:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for upper, n in zip(self.buckets, self.counts):
+            cumulative += n
+            buckets["+Inf" if upper == math.inf else str(upper)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "buckets": buckets
+        }
+
+
+class ObserverMetrics:
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+        self._outcomes: Dict[str, Counter] = defaultdict(Counter)
+
+    def observe(self, observer: str, seconds: float, outcome: str = "ok"):
+        """
+        记录一次观察者执行：outcome 为 ok / error / timeout。
+        """
+        self._histograms[observer].observe(seconds)
+        self._outcomes[observer][outcome] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {**histogram.snapshot(), "outcomes": dict(self._outcomes[name])}
+            for name, histogram in sorted(self._histograms.items())
+        }
+
+    def clear(self):
+        self._histograms.clear()
+        self._outcomes.clear()
+
+
+# 进程内单例
+observer_metrics = ObserverMetrics()
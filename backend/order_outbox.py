@@ -0,0 +1,187 @@
+"""
+订单事件发件箱投递任务。
+下单事务中写入的 order_outbox 事件由后台 asyncio 任务投递给异步观察者：
+- 领取：按可领取时间取出待处理事件（FOR UPDATE SKIP LOCKED，多进程不会重复领取），
+  并把 available_at 推迟一个租约时长；进程崩溃或停止后，租约到期的事件会被重新领取。
+- 背压：只领取内存队列剩余容量个事件，队列满时事件留在表中等待。
+- 幂等：每个观察者的写入与投递记录（event_id + observer 唯一）在同一事务提交，
+  重试时跳过已投递的观察者。
+- 分发：默认并发执行各观察者（dispatch="parallel"），每个观察者使用独立会话并有超时限制，
+  慢观察者不会拖慢其他观察者；dispatch="sequential" 时依次执行。
+- 重试：失败的事件按指数退避重新投递，超过最大次数后标记为 failed。
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import select, update
+from backend.database import async_session
+from backend.models import Order, OrderOutboxEvent, OrderEventDelivery
+from backend.order_observers.metrics import observer_metrics
+
+
+class OrderOutboxWorker:
+    def __init__(self, session_factory=async_session, concurrency: int = 4, queue_size: int = 100,
+                 batch_size: int = 20, poll_interval: float = 1.0, lease_seconds: float = 60.0,
+                 max_attempts: int = 5, retry_base_delay: float = 2.0,
+                 dispatch: str = "parallel", observer_timeout: float = 10.0):
+        self._session_factory = session_factory
+        self._concurrency = concurrency
+        self._queue_size = queue_size
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._retry_base_delay = retry_base_delay
+        self._parallel = dispatch == "parallel"
+        self._observer_timeout = observer_timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def wake(self):
+        """
+        下单事务提交后调用，立即领取新事件而不必等待下一次轮询。
+        """
+        self._wakeup.set()
+
+    async def claim(self, limit: int) -> List[int]:
+        """
+        领取最多 limit 个可处理的事件，返回事件 ID。
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(OrderOutboxEvent.id)
+                .where(OrderOutboxEvent.status == "pending", OrderOutboxEvent.available_at <= now)
+                .order_by(OrderOutboxEvent.available_at, OrderOutboxEvent.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            )
+            event_ids = list(result.scalars().all())
+            if event_ids:
+                await db.execute(
+                    update(OrderOutboxEvent)
+                    .where(OrderOutboxEvent.id.in_(event_ids))
+                    .values(available_at=now + timedelta(seconds=self._lease_seconds))
+                )
+            await db.commit()
+        return event_ids
+
+    async def process(self, event_id: int):
+        """
+        将一个事件投递给所有尚未成功处理它的异步观察者。
+        """
+        # 防止循环引用
+        from backend.order_observers import outbox_observers
+
+        async with self._session_factory() as db:
+            event = await db.get(OrderOutboxEvent, event_id)
+            if event is None or event.status != "pending":
+                return
+            order_id = event.order_id
+            result = await db.execute(
+                select(OrderEventDelivery.observer).where(OrderEventDelivery.event_id == event_id)
+            )
+            delivered = set(result.scalars().all())
+
+        observers = [obs for obs in outbox_observers() if obs.name not in delivered]
+        if self._parallel:
+            # 各观察者相互独立，并发执行，耗时取决于最慢的一个而不是总和
+            results = await asyncio.gather(*(self._deliver(event_id, order_id, obs) for obs in observers))
+        else:
+            results = [await self._deliver(event_id, order_id, obs) for obs in observers]
+        errors = [error for error in results if error]
+
+        async with self._session_factory() as db:
+            event = await db.get(OrderOutboxEvent, event_id)
+            if errors:
+                event.attempts += 1
+                event.last_error = "; ".join(errors)[:255]
+                if event.attempts >= self._max_attempts:
+                    event.status = "failed"
+                else:
+                    delay = self._retry_base_delay * 2 ** (event.attempts - 1)
+                    event.available_at = datetime.utcnow() + timedelta(seconds=delay)
+            else:
+                event.status = "done"
+            await db.commit()
+
+    async def _deliver(self, event_id: int, order_id: int, obs) -> Optional[str]:
+        """
+        在独立会话中执行一个观察者，观察者写入与投递记录一起提交；返回错误信息，成功时返回 None。
+        """
+        timeout = obs.timeout if obs.timeout is not None else self._observer_timeout
+        start = time.perf_counter()
+        outcome, error = "ok", None
+        try:
+            async with self._session_factory() as db:
+                order = await db.get(Order, order_id)
+                if order is None:
+                    raise LookupError(f"order {order_id} not found")
+                # 超时后取消执行，会话关闭时回滚未提交的写入
+                await asyncio.wait_for(self._run_observer(db, obs, order, event_id), timeout=timeout)
+        except asyncio.TimeoutError:
+            outcome, error = "timeout", f"{obs.name}: timed out after {timeout}s"
+        except Exception as e:
+            outcome, error = "error", f"{obs.name}: {e}"
+        observer_metrics.observe(obs.name, time.perf_counter() - start, outcome)
+        if error:
+            print(f"观察者处理订单事件 {event_id} 失败: {error}")
+        return error
+
+    async def _run_observer(self, db, obs, order: Order, event_id: int):
+        await obs.on_order_created(order, db)
+        db.add(OrderEventDelivery(event_id=event_id, observer=obs.name))
+        await db.commit()
+
+    async def _poll(self):
+        while True:
+            try:
+                free = self._queue_size - self._queue.qsize()
+                event_ids = await self.claim(min(self._batch_size, free))
+                for event_id in event_ids:
+                    await self._queue.put(event_id)
+            except Exception as e:
+                print(f"Failed to claim order events: {e}")
+                event_ids = []
+            if len(event_ids) < self._batch_size:
+                # 没有更多事件（或队列已满）时等待唤醒或下一次轮询
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def _work(self):
+        while True:
+            event_id = await self._queue.get()
+            try:
+                await self.process(event_id)
+            except Exception as e:
+                # 未处理完的事件在租约到期后重新领取
+                print(f"Failed to process order event {event_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        if not self._tasks:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._poll())]
+            self._tasks += [asyncio.create_task(self._work()) for _ in range(self._concurrency)]
+
+    async def stop(self):
+        """
+        停止后台任务；已领取但未处理的事件在租约到期后由下次启动的任务重新领取。
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+# 进程内单例
+order_outbox_worker = OrderOutboxWorker()
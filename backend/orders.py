@@ -1,24 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import hashlib
+import json
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, func, insert
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 from backend.database import get_db
-from backend.models import Package, Order, Coupon, UserCoupon, CouponStatus, Shop, User
-from backend.schema import OrderCreate, OrderCreated, OrderListResponse
+from backend.models import Package, Order, Coupon, UserCoupon, CouponStatus, Shop, User, OrderIdempotencyKey
+from backend.schema import OrderCreate, OrderCreated, OrderListResponse, OrderBatchCreate, OrderBatchLineResult, OrderBatchResponse
 from backend.login import get_current_user
+from backend.user_order_stats import record_user_orders, user_order_count
+from backend.order_history import fetch_user_orders
 
 router = APIRouter()
 
+def order_request_hash(order_data: OrderCreate) -> str:
+    """
+    下单请求体摘要，用于识别同一幂等键被用于不同的下单请求。
+    """
+    return hashlib.sha256(order_data.model_dump_json().encode()).hexdigest()
+
+async def replay_idempotent_order(db: AsyncSession, user_id: int, idempotency_key: str, request_hash: str):
+    """
+    按 (user_id, 幂等键) 唯一索引查找首次下单的响应；该键未使用过时返回 None。
+    """
+    result = await db.execute(
+        select(OrderIdempotencyKey.request_hash, OrderIdempotencyKey.response).where(
+            OrderIdempotencyKey.user_id == user_id,
+            OrderIdempotencyKey.idempotency_key == idempotency_key
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+    if row.request_hash != request_hash:
+        raise HTTPException(status_code=422, detail="该 Idempotency-Key 已用于其他下单请求")
+    return json.loads(row.response)
+
+COUPON_EXPIRED = "该优惠券已过期"
+
+def coupon_unavailable_reason(package: Package, shop: Shop | None, user_coupon: UserCoupon,
+                              coupon: Coupon, used_count: int) -> str | None:
+    """
+    校验优惠券能否用于该套餐，返回不可用的原因，可用时返回 None。
+    used_count 为该用户已使用同一优惠券的次数。
+    """
+    # 1. 检查优惠券库存
+    if coupon.remaining_quantity and coupon.remaining_quantity <= 0:
+        return "优惠券已被领完，请选择其他优惠"
+
+    # 2. 检查用户使用限制
+    if coupon.per_user_limit and used_count >= coupon.per_user_limit:
+        return f"您已超过该优惠券的限用次数（{coupon.per_user_limit}次）"
+
+    if coupon.min_spend and package.price < coupon.min_spend:
+        return "最低消费金额未满足"
+
+    # 检查是否过期
+    if user_coupon.expires_at and datetime.utcnow() > user_coupon.expires_at:
+        return COUPON_EXPIRED
+
+    if coupon.shop_restriction and shop and shop.name != coupon.shop_restriction:
+        return "该商户不可使用此优惠券"
+
+    if coupon.category and shop and shop.category != coupon.category:
+        return "该商户不符合此类别"
+    return None
+
 @router.post("/orders", response_model=OrderCreated)
 async def create_order(order_data: OrderCreate,
                        db: AsyncSession = Depends(get_db),
-                       current_user: Dict[str, Any] = Depends(get_current_user)):
+                       current_user: Dict[str, Any] = Depends(get_current_user),
+                       idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=64)):
     """
     创建订单接口：用户发起下单，可选择使用优惠券（每笔订单限用一张券）。
+    客户端超时重试时携带相同的 Idempotency-Key 请求头，直接返回首次下单的结果，不会重复下单。
     """
     user_id = current_user["id"]
 
+    # 幂等重试：命中时跳过全部校验，直接返回首次下单的响应
+    request_hash = None
+    if idempotency_key:
+        request_hash = order_request_hash(order_data)
+        replay = await replay_idempotent_order(db, user_id, idempotency_key, request_hash)
+        if replay is not None:
+            return replay
+
     # 查询套餐是否存在
     package = await db.get(Package, order_data.package_id)
     if not package:
@@ -44,17 +114,9 @@ async def create_order(order_data: OrderCreate,
 
         user_coupon, coupon = data
 
-        # --- 新增验证开始 ---
-        # 1. 检查优惠券库存
-        if coupon.remaining_quantity and coupon.remaining_quantity <= 0:
-            raise HTTPException(
-                status_code=400,
-                detail="优惠券已被领完，请选择其他优惠"
-            )
-
-        # 2. 检查用户使用限制
+        used_count = 0
         if coupon.per_user_limit:
-            used_count = await db.execute(
+            result = await db.execute(
                 select(func.count(UserCoupon.id))
                 .where(
                     UserCoupon.user_id == user_id,
@@ -62,32 +124,19 @@ async def create_order(order_data: OrderCreate,
                     UserCoupon.status == CouponStatus.used
                 )
             )
-            if (used_count.scalar() or 0) >= coupon.per_user_limit:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"您已超过该优惠券的限用次数（{coupon.per_user_limit}次）"
-                )
-
-        if coupon.min_spend and package.price < coupon.min_spend:
-            raise HTTPException(status_code=400, detail="最低消费金额未满足")
-    
-        # 检查是否过期
-        if user_coupon.expires_at and datetime.utcnow() > user_coupon.expires_at:
-            user_coupon.status = CouponStatus.expired
-
-            await db.commit()
-            raise HTTPException(status_code=400, detail="该优惠券已过期")
-
+            used_count = result.scalar() or 0
 
         # 获取店铺信息
-        shop = await db.get(Shop, package.shop_id)
-
-        if coupon.shop_restriction and shop and shop.name != coupon.shop_restriction:
-            raise HTTPException(status_code=400, detail="该商户不可使用此优惠券")
-
-        if coupon.category and shop and shop.category != coupon.category:
-            raise HTTPException(status_code=400, detail="该商户不符合此类别")
+        shop = None
+        if coupon.shop_restriction or coupon.category:
+            shop = await db.get(Shop, package.shop_id)
 
+        reason = coupon_unavailable_reason(package, shop, user_coupon, coupon, used_count)
+        if reason == COUPON_EXPIRED:
+            user_coupon.status = CouponStatus.expired
+            await db.commit()
+        if reason:
+            raise HTTPException(status_code=400, detail=reason)
 
         # 校验通过后，应用优惠券的折扣逻辑（策略模式）
         from backend.coupon_strategies import get_coupon_strategy
@@ -104,18 +153,15 @@ async def create_order(order_data: OrderCreate,
         inviter = inviter_result.scalar()
         if not inviter or inviter.id == user_id:
             raise HTTPException(status_code=400, detail="无效的邀请码")
-        order_count = await db.execute(
-            select(func.count()).where(Order.user_id == user_id)
-        )
-        if order_count.scalar() > 0:
+        if await user_order_count(db, user_id) > 0:
             raise HTTPException(status_code=400, detail="仅首次下单可使用邀请码")
         if final_price <= 10:
             raise HTTPException(status_code=400, detail="订单金额需超过10元")
 
 
-    # 生成16位数字券码，确保唯一（此处略去数据库唯一性检测逻辑）
-    import random, string
-    voucher_code = ''.join(random.choices(string.digits, k=16))
+    # 生成16位数字券码：序号经置换生成，不会重复，无需查询数据库判重
+    from backend.voucher_codes import voucher_code_generator
+    voucher_code = await voucher_code_generator.next_code()
 
     # 创建订单
     new_order = Order(
@@ -127,75 +173,210 @@ async def create_order(order_data: OrderCreate,
         invitation_code=order_data.invitation_code
     )
     db.add(new_order)
-    await db.commit()
-    await db.refresh(new_order)
+    # 下单、邀请记录、同步观察者（标记优惠券已使用）与发件箱事件在同一事务中完成，只提交一次
+    await db.flush()
 
-    # 邀请记录（在订单创建后调用）
+    # 邀请记录（在保存点中写入，失败时只回滚邀请记录）
+    invitation_recorded = False
     if order_data.invitation_code and inviter:
         from backend.invitation import record_invitation
         try:
-            await record_invitation(db, order=new_order, inviter_id=inviter.id, invited_user_id=user_id)
+            async with db.begin_nested():
+                invitation_recorded = await record_invitation(
+                    db, order=new_order, inviter_id=inviter.id, invited_user_id=user_id
+                )
         except Exception as e:
             # 记录日志，但不影响订单创建
             print(f"Failed to record invitation: {str(e)}")
 
-    # 使用观察者模式通知其他模块（如：更新销量、标记优惠券已使用）
+    # 使用观察者模式通知其他模块：标记优惠券已使用（同步），更新销量等写入发件箱（异步）
     from backend.order_observers import notify_order_created
     await notify_order_created(new_order, db)
+    await record_user_orders(db, user_id, 1, new_order.order_amount, new_order.created_at)
 
-    # 返回订单信息
-    return {
+    order_created = {
         "id": new_order.id,
         "voucher_code": new_order.voucher_code,
         "order_amount": new_order.order_amount,
         "created_at": new_order.created_at
     }
+    if idempotency_key:
+        # 幂等键与订单同一事务提交，唯一索引保证同一个键只会生成一笔订单
+        db.add(OrderIdempotencyKey(
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            request_hash=request_hash,
+            order_id=new_order.id,
+            response=json.dumps(jsonable_encoder(order_created))
+        ))
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        # 并发的重试请求已先提交：回滚本次订单，返回先提交的那笔订单
+        await db.rollback()
+        replay = await replay_idempotent_order(db, user_id, idempotency_key, request_hash)
+        if replay is None:
+            raise
+        return replay
+
+    # 唤醒发件箱投递任务，异步观察者（如更新销量）随即处理本订单事件
+    from backend.order_outbox import order_outbox_worker
+    order_outbox_worker.wake()
+
+    # 可延后的副作用在提交后执行：邀请奖励券发放失败不影响已创建的订单
+    if invitation_recorded:
+        from backend.invitation import award_invitation_coupon
+        try:
+            await award_invitation_coupon(db, inviter.id)
+        except Exception as e:
+            print(f"Failed to award invitation coupon: {str(e)}")
+
+    # 返回订单信息
+    return order_created
+
+@router.post("/orders/batch", response_model=OrderBatchResponse)
+async def create_orders_batch(batch: OrderBatchCreate,
+                              db: AsyncSession = Depends(get_db),
+                              current_user: Dict[str, Any] = Depends(get_current_user)):
+    """
+    批量下单接口：一次提交购物车中的多个套餐，每行可选一张优惠券（不支持邀请码）。
+    套餐、优惠券、用券次数与店铺各用一次查询加载，在内存中校验与计价，
+    所有订单与发件箱事件各一次批量插入、一次提交；校验失败的行被跳过，并在结果中返回原因。
+    """
+    user_id = current_user["id"]
+    lines = batch.items
+
+    result = await db.execute(select(Package).where(Package.id.in_({line.package_id for line in lines})))
+    packages = {package.id: package for package in result.scalars().all()}
+
+    user_coupons = {}
+    used_counts = Counter()
+    shops = {}
+    coupon_ids = {line.coupon_id for line in lines if line.coupon_id}
+    if coupon_ids:
+        result = await db.execute(
+            select(UserCoupon, Coupon).join(Coupon, UserCoupon.coupon_id == Coupon.id).where(
+                UserCoupon.user_id == user_id,
+                UserCoupon.id.in_(coupon_ids),
+                UserCoupon.status == CouponStatus.unused
+            )
+        )
+        user_coupons = {user_coupon.id: (user_coupon, coupon) for user_coupon, coupon in result.all()}
+
+        limited = {coupon.id for _, coupon in user_coupons.values() if coupon.per_user_limit}
+        if limited:
+            result = await db.execute(
+                select(UserCoupon.coupon_id, func.count(UserCoupon.id))
+                .where(
+                    UserCoupon.user_id == user_id,
+                    UserCoupon.coupon_id.in_(limited),
+                    UserCoupon.status == CouponStatus.used
+                )
+                .group_by(UserCoupon.coupon_id)
+            )
+            used_counts.update(dict(result.all()))
+
+        shop_ids = {packages[line.package_id].shop_id for line in lines if line.coupon_id and line.package_id in packages}
+        result = await db.execute(select(Shop).where(Shop.id.in_(shop_ids)))
+        shops = {shop.id: shop for shop in result.scalars().all()}
+
+    from backend.coupon_strategies import get_coupon_strategy
+    from backend.voucher_codes import voucher_code_generator
+
+    results: List[OrderBatchLineResult | None] = [None] * len(lines)
+    rows = []  # (行下标, 订单字段)
+    claimed = set()  # 本次已使用的用户优惠券，同一张券只能用于一行
+    for index, line in enumerate(lines):
+        package = packages.get(line.package_id)
+        if package is None:
+            results[index] = OrderBatchLineResult(index=index, detail="未找到指定套餐")
+            continue
+
+        final_price = package.price
+        if line.coupon_id:
+            data = None if line.coupon_id in claimed else user_coupons.get(line.coupon_id)
+            if data is None:
+                results[index] = OrderBatchLineResult(index=index, detail="该优惠券不可用或已使用")
+                continue
+            user_coupon, coupon = data
+            reason = coupon_unavailable_reason(package, shops.get(package.shop_id), user_coupon, coupon, used_counts[coupon.id])
+            if reason == COUPON_EXPIRED:
+                # 与其他订单一起提交
+                user_coupon.status = CouponStatus.expired
+            if reason:
+                results[index] = OrderBatchLineResult(index=index, detail=reason)
+                continue
+            claimed.add(line.coupon_id)
+            used_counts[coupon.id] += 1
+            # 用户券已在上面加载，直接标记为已使用，与订单一起提交（不再经 CouponUsageObserver 逐单查询）
+            user_coupon.status = CouponStatus.used
+            final_price = get_coupon_strategy(coupon.discount_type).apply_discount(package.price, coupon)
+
+        rows.append((index, {
+            "user_id": user_id,
+            "package_id": package.id,
+            "voucher_code": await voucher_code_generator.next_code(),
+            "coupon_id": line.coupon_id or None,
+            "order_amount": final_price,
+            "created_at": datetime.utcnow()
+        }))
+
+    if rows:
+        # 一条批量 INSERT 写入所有订单，再按券码取回订单 ID
+        # （使用 Core 表：ORM 批量插入会按值为 None 的列拆分成多条语句）
+        await db.execute(insert(Order.__table__), [values for _, values in rows])
+        result = await db.execute(
+            select(Order).where(Order.voucher_code.in_([values["voucher_code"] for _, values in rows]))
+        )
+        orders = {order.voucher_code: order for order in result.scalars().all()}
+
+        from backend.order_observers import notify_orders_created, CouponUsageObserver
+        # 发件箱事件一次批量写入；用券已在上面处理
+        await notify_orders_created(
+            [orders[values["voucher_code"]] for _, values in rows], db, handled=(CouponUsageObserver,)
+        )
+        for index, values in rows:
+            order = orders[values["voucher_code"]]
+            results[index] = OrderBatchLineResult(index=index, order=OrderCreated(
+                id=order.id,
+                voucher_code=order.voucher_code,
+                order_amount=order.order_amount,
+                created_at=order.created_at
+            ))
+        await record_user_orders(
+            db, user_id, len(rows),
+            sum(values["order_amount"] for _, values in rows),
+            min(values["created_at"] for _, values in rows)
+        )
+
+    await db.commit()
+
+    if rows:
+        from backend.order_outbox import order_outbox_worker
+        order_outbox_worker.wake()
+
+    return OrderBatchResponse(results=results)
+
+@router.get("/orders/observers/metrics")
+async def get_order_observer_metrics():
+    """
+    各订单观察者的执行耗时直方图与结果计数（ok / error / timeout）。
+    """
+    from backend.order_observers.metrics import observer_metrics
+    return observer_metrics.snapshot()
 
 @router.get("/user/orders", response_model=OrderListResponse)
 async def get_user_orders(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
-    获取用户订单列表，支持分页
+    获取用户订单列表，支持分页（传入 cursor 时使用游标分页，返回 next_cursor）
     """
-    user_id = current_user["id"]
-
-    # 查询订单总数
-    total_query = select(func.count(Order.id)).where(Order.user_id == user_id)
-    total_result = await db.execute(total_query)
-    total_count = total_result.scalar()
-    total_pages = (total_count + page_size - 1) // page_size
-
-    # 查询订单列表
-    query = (
-        select(Order, Package, Shop)
-        .join(Package, Order.package_id == Package.id)
-        .join(Shop, Package.shop_id == Shop.id)
-        .where(Order.user_id == user_id)
-        .order_by(Order.created_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-    )
-
-    result = await db.execute(query)
-    orders = result.all()
-
-    order_list = [
-    {
-        "order_id": order.Order.id,
-        "package_title": order.Package.title,
-        "shop_name": order.Shop.name,
-        "created_at": order.Order.created_at.isoformat(),  # 确保日期格式化为 ISO 字符串
-        "voucher_code": None  # 不返回 voucher_code，与前端显示需求一致
-    }
-    for order in orders
-    ]
-
-    return OrderListResponse (
-        page=page,
-        total_pages=total_pages,
-        data=order_list
-    )
\ No newline at end of file
+    return await fetch_user_orders(db, current_user["id"], page, page_size, cursor)
@@ -0,0 +1,159 @@
+"""
+分页工具。
+- 偏移分页（默认）：count 总数 + OFFSET/LIMIT。
+- 游标分页（keyset，可选）：以上一页最后一行的主键作为不透明游标，
+  通过 "排序键 < 该行排序键" 条件直接定位下一页，深分页不再线性变慢，且可跳过 count。
+  游标不携带排序列的值，比较时在数据库中按主键取出，避免浮点列（MySQL FLOAT 为单精度）
+  经客户端往返后与存储值不相等而重复或遗漏数据。
+"""
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# 排序键定义：[(列, "asc" | "desc"), ...]，最后一列必须唯一（通常为主键）
+Keyset = Sequence[Tuple[Any, str]]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    将排序键值编码为 URL 安全的不透明游标。
+    """
+    payload = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    解析游标，格式不合法时返回 400。
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("cursor size mismatch")
+        if any(isinstance(v, (list, bool)) for v in payload):
+            raise ValueError("invalid cursor value")
+        return [
+            datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) else v
+            for v in payload
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_order_by(keyset: Keyset) -> list:
+    return [col.desc() if direction == "desc" else col.asc() for col, direction in keyset]
+
+
+def _cursor_row_value(col, pk, last_id):
+    """
+    游标行在 col 上的值：(SELECT col FROM 表 WHERE 主键 = :last_id)。
+    使用表的别名，避免标量子查询与外层查询的同一张表关联。
+    """
+    column, pk_column = col.expression, pk.expression
+    table = column.table.alias()
+    return select(table.c[column.name]).where(table.c[pk_column.name] == last_id).scalar_subquery()
+
+
+def _column_after(col, value, direction: str):
+    """
+    col 排在 value 之后的条件。可为空的列按 MySQL 的规则处理：NULL 视为最小值，
+    升序时排在最前，降序时排在最后。
+    """
+    if direction == "desc":
+        step = col < value
+        if col.expression.nullable:
+            step = or_(step, and_(value.is_not(None), col.is_(None)))
+    else:
+        step = col > value
+        if col.expression.nullable:
+            step = or_(step, and_(value.is_(None), col.is_not(None)))
+    return step
+
+
+def _column_equal(col, value):
+    if col.expression.nullable:
+        return or_(col == value, and_(col.is_(None), value.is_(None)))
+    return col == value
+
+
+def keyset_after(keyset: Keyset, last_id: Any):
+    """
+    构造 "排在游标之后" 的条件：按字典序逐列比较（支持各列方向不同）。
+    last_id 为上一页最后一行的主键（keyset 最后一列），其余列与该行在数据库中的值比较；
+    该行已被删除时返回空页。
+    """
+    pk, pk_direction = keyset[-1]
+    clauses, equal_prefix = [], []
+    for col, direction in keyset[:-1]:
+        value = _cursor_row_value(col, pk, last_id)
+        clauses.append(and_(*equal_prefix, _column_after(col, value, direction)))
+        equal_prefix.append(_column_equal(col, value))
+    pk_step = pk < last_id if pk_direction == "desc" else pk > last_id
+    clauses.append(and_(*equal_prefix, pk_step))
+    return or_(*clauses)
+
+
+async def paginate_query(
+    db: AsyncSession,
+    query,
+    page: int,
+    page_size: int,
+    return_scalars: bool = True,
+    cursor: Optional[str] = None,
+    keyset: Optional[Keyset] = None,
+    id_fn: Optional[Callable[[Any], Any]] = None,
+    with_total: Optional[bool] = None,
+    total: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    分页查询。传入 cursor（空字符串表示第一页）与 keyset 时启用游标分页，
+    此时默认跳过 count（total 为 None），并在结果中返回 next_cursor。
+    id_fn 用于从结果行中取出主键（keyset 最后一列）的值，默认按列名读取 ORM 对象属性。
+    total 为已知的总数（如物化的计数）时直接使用，不再执行 count。
+    """
+    cursor_mode = cursor is not None and keyset is not None
+    if with_total is None:
+        with_total = not cursor_mode
+
+    if total is None and with_total:
+        count_query = query.with_only_columns(func.count()).order_by(None)
+        total = await db.scalar(count_query)
+
+    if cursor_mode:
+        query = query.order_by(None).order_by(*keyset_order_by(keyset))
+        if cursor:
+            query = query.where(keyset_after(keyset, decode_cursor(cursor, 1)[0]))
+        # 多取一行判断是否还有下一页
+        query = query.limit(page_size + 1)
+    else:
+        query = query.offset((page - 1) * page_size).limit(page_size)
+
+    result = await db.execute(query)
+
+    if return_scalars:
+        items = result.scalars().all()
+    else:
+        items = result.all()
+
+    response = {
+        "total": total,
+        "page": None if cursor_mode else page,
+        "page_size": page_size,
+        "data": items
+    }
+
+    if cursor_mode:
+        has_more = len(items) > page_size
+        items = items[:page_size]
+        if id_fn is None:
+            id_fn = lambda item: getattr(item, keyset[-1][0].key)
+        response["data"] = items
+        response["next_cursor"] = encode_cursor([id_fn(items[-1])]) if has_more and items else None
+
+    return response
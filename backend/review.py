@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from datetime import datetime
@@ -8,6 +8,7 @@ from . import models, schema
 from .database import get_db
 from .login import get_current_user
 from .coupons import issue_coupon
+from .pagination import paginate_query, keyset_order_by
 
 router = APIRouter()
 
@@ -167,14 +168,17 @@ async def reply_to_review(
 @router.get("/shops/{shop_id}/reviews", response_model=list[schema.ReviewResponse])
 async def get_shop_reviews(
     shop_id: int,
+    response: Response,
     page: int = 1,
     limit: int = 10,
     sort: str = "newest",
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
     获取商户全部点评（含嵌套回复，需登录）
+    传入 cursor 时使用游标分页，下一页游标通过响应头 X-Next-Cursor 返回
     """
     # 校验商户存在
     shop = await db.execute(select(models.Shop).where(models.Shop.id == shop_id))
@@ -183,17 +187,20 @@ async def get_shop_reviews(
         raise HTTPException(status_code=404, detail="商户不存在")
     
     # 排序方式
-    order_by_clause = models.Review.created_at.desc() if sort == "newest" else models.Review.created_at.asc()
+    direction = "desc" if sort == "newest" else "asc"
+    keyset = [(models.Review.created_at, direction), (models.Review.id, direction)]
 
     # 查询所有点评（按时间倒序）
-    reviews = await db.execute(
+    page_result = await paginate_query(
+        db,
         select(models.Review)
         .where(models.Review.shop_id == shop_id)
-        .order_by(order_by_clause)
-        .offset((page - 1) * limit)
-        .limit(limit)
+        .order_by(*keyset_order_by(keyset)),
+        page, limit, cursor=cursor, keyset=keyset, with_total=False
     )
-    reviews = reviews.scalars().all()
+    reviews = page_result["data"]
+    if page_result.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = page_result["next_cursor"]
 
     result = []
     for rv in reviews:
@@ -254,20 +261,27 @@ async def get_shop_reviews(
 
 @router.get("/user/reviews", response_model=list[schema.ReviewResponse])
 async def get_user_reviews(
+    response: Response,
     limit: int = 5,
+    cursor: str | None = None,
     db: AsyncSession = Depends(get_db),
     current_user: dict = Depends(get_current_user),
 ):
     """
     获取用户的点评记录（需登录）
+    传入 cursor 时使用游标分页，下一页游标通过响应头 X-Next-Cursor 返回
     """
-    reviews = await db.execute(
+    keyset = [(models.Review.created_at, "desc"), (models.Review.id, "desc")]
+    page_result = await paginate_query(
+        db,
         select(models.Review)
         .where(models.Review.user_id == current_user['id'])
-        .order_by(models.Review.created_at.desc())
-        .limit(limit)
+        .order_by(*keyset_order_by(keyset)),
+        1, limit, cursor=cursor, keyset=keyset, with_total=False
     )
-    reviews = reviews.scalars().all()
+    reviews = page_result["data"]
+    if page_result.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = page_result["next_cursor"]
 
     result = []
     for rv in reviews:
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -70,16 +70,46 @@ class OrderCreated(BaseModel):
     创建订单成功后返回的数据
     """
     id: int               # 订单 ID
-    voucher_code: str     # 随机生成的 16 位券码
+    voucher_code: str     # 16 位券码（末位为校验位）
     order_amount: float   # 优惠后的实付金额
     created_at: datetime  # 下单时间
 
+class OrderBatchLine(BaseModel):
+    """
+    批量下单中的一行：一个套餐，可选一张优惠券
+    """
+    package_id: int
+    coupon_id: int | None = None
+
+
+class OrderBatchCreate(BaseModel):
+    """
+    批量下单请求体
+    """
+    items: List[OrderBatchLine] = Field(..., min_length=1, max_length=50)
+
+
+class OrderBatchLineResult(BaseModel):
+    """
+    批量下单中每一行的结果：成功时返回订单，失败时返回原因
+    """
+    index: int                          # 对应请求中 items 的下标
+    order: OrderCreated | None = None
+    detail: str | None = None
+
+
+class OrderBatchResponse(BaseModel):
+    results: List[OrderBatchLineResult]
+
 class OrderListResponse(BaseModel):
     """
     用户订单列表响应，包含分页信息
     """
     page: int
+    page_size: int
+    total: int                      # 订单总数
     total_pages: int
+    next_cursor: str | None = None  # 游标分页时下一页的游标
     data: List[Order]
 
 
@@ -0,0 +1,87 @@
+"""
+店铺搜索的整页响应缓存。
+以规范化后的查询参数、目录版本号（generation）与当前分钟（营业状态随时间变化）为键，
+缓存序列化后的 JSON 字节与 ETag；同一键的并发请求只执行一次查询（single-flight），
+其余请求等待同一结果。店铺或图片变更提交后 generation 递增，旧条目随即失效。
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from backend.catalog_events import CatalogObserver
+
+# (ETag, JSON 响应体)
+CachedSearch = Tuple[str, bytes]
+
+
+class SearchResponseCache(CatalogObserver):
+    def __init__(self, max_entries: int = 1024):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedSearch]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[CachedSearch]]) -> CachedSearch:
+        key = (self.generation, key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            # 已有相同请求在查询，等待其结果
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # 发起查询的请求被取消（如客户端断开），由当前请求重新查询
+                return await self.get_or_compute(key[1], compute)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(entry)
+        # 查询期间目录发生变更时不写入缓存
+        if key[0] == self.generation:
+            self._entries[key] = entry
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def bump_generation(self):
+        self.generation += 1
+        self._entries.clear()
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self.bump_generation()
+
+    def on_shop_deleted(self, shop_id: int):
+        self.bump_generation()
+
+    def on_shop_images_changed(self, shop_id: int):
+        self.bump_generation()
+
+
+# 进程内单例
+search_response_cache = SearchResponseCache()
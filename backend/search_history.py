@@ -0,0 +1,150 @@
+"""
+搜索历史写缓冲。
+搜索接口只把关键词记录到进程内缓冲（同一关键词合并为最近一次搜索时间），
+由后台任务定期批量写入 search_history 表，搜索读路径不再等待任何写操作。
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select, update, insert
+from backend.database import async_session
+from backend.models import SearchHistory
+from backend.tokenizer import normalize
+
+
+# 关键词列长度上限（与 SearchHistory.keyword 一致）
+MAX_KEYWORD_LENGTH = 100
+
+
+def keyword_key(keyword: str) -> str:
+    """
+    关键词在 search_history.keyword 列排序规则下的比较键：折叠大小写、重音，并忽略尾部空格（PAD SPACE）。
+    数据库按排序规则返回的已有行（如 "Kfc"）与缓冲中的关键词（"kfc"）通过该键对应。
+    """
+    return normalize(keyword).rstrip(" ")
+
+
+class SearchHistoryBuffer:
+    def __init__(self, session_factory=async_session, flush_interval: float = 2.0, max_pending: int = 5000):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        # 比较键 -> (关键词, 最近搜索时间)；排序规则下相等的关键词合并为一条
+        self._pending: Dict[str, Tuple[str, datetime]] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, keyword: str):
+        """
+        记录一次搜索（不访问数据库）。超出列长度的关键词截断后记录。
+        """
+        keyword = keyword[:MAX_KEYWORD_LENGTH]
+        key = keyword_key(keyword)
+        if not key:
+            return
+        self._pending[key] = (keyword, datetime.utcnow())
+        if len(self._pending) >= self._max_pending:
+            self._flush_requested.set()
+
+    def pending(self) -> List[Tuple[str, datetime]]:
+        """
+        返回尚未落库的搜索记录。
+        """
+        return list(self._pending.values())
+
+    def clear(self):
+        self._pending.clear()
+
+    async def _write(self, batch: Dict[str, Tuple[str, datetime]]):
+        """
+        在一个事务中写入一批记录：已存在的关键词更新搜索时间，其余批量插入。
+        """
+        async with self._session_factory() as db:
+            result = await db.execute(
+                select(SearchHistory.id, SearchHistory.keyword)
+                .where(SearchHistory.keyword.in_([keyword for keyword, _ in batch.values()]))
+                .order_by(SearchHistory.id)
+            )
+            existing: Dict[str, int] = {}
+            for history_id, keyword in result.all():
+                key = keyword_key(keyword)
+                # 数据库按排序规则匹配到、但折叠规则不同的行忽略，对应关键词按新行插入
+                if key in batch:
+                    existing.setdefault(key, history_id)
+
+            updates = [
+                {"id": history_id, "searched_at": batch[key][1]}
+                for key, history_id in existing.items()
+            ]
+            inserts = [
+                {"keyword": keyword, "searched_at": searched_at}
+                for key, (keyword, searched_at) in batch.items() if key not in existing
+            ]
+            if updates:
+                await db.execute(update(SearchHistory), updates)
+            if inserts:
+                await db.execute(insert(SearchHistory), inserts)
+            await db.commit()
+
+    async def flush(self):
+        """
+        将缓冲中的记录批量写入数据库。
+        整批写入失败时逐条重试：只有部分关键词失败时视为坏数据，丢弃并打印日志，不阻塞其他关键词；
+        全部失败（如数据库不可用）时把记录放回缓冲，等待下次重试。
+        """
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await self._write(batch)
+            return
+        except Exception as e:
+            print(f"Failed to flush search history: {e}")
+
+        failed = batch
+        if len(batch) > 1:
+            failed = {}
+            for key, entry in batch.items():
+                try:
+                    await self._write({key: entry})
+                except Exception as e:
+                    print(f"Failed to flush search history keyword {entry[0]!r}: {e}")
+                    failed[key] = entry
+        if len(failed) < len(batch):
+            # 其他关键词已写入，失败的关键词视为坏数据丢弃
+            return
+        for key, entry in failed.items():
+            # 保留较新的搜索时间
+            if key not in self._pending or self._pending[key][1] < entry[1]:
+                self._pending[key] = entry
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._flush_requested = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        停止后台任务并写入剩余记录。
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# 进程内单例
+search_history_buffer = SearchHistoryBuffer()
@@ -0,0 +1,125 @@
+"""
+店铺关键词倒排索引。
+店铺写入时由 models 中的 ORM 事件维护 shop_search_tokens 表；
+查询时通过词项 posting list 求交得到候选店铺，shops 与候选集连接后只在候选行上执行原有的 LIKE 条件校验，
+无需全表扫描。词项与查询串都经 tokenizer.normalize 折叠大小写、重音与全角 / 半角，
+对这些等价关系，候选集包含 LIKE 在 MySQL *_ai_ci 排序规则下的全部命中行，结果集与直接使用 LIKE 查询一致。
+个别排序规则特有的展开（如 utf8mb4_0900_ai_ci 中 "æ" = "ae"）不在折叠范围内，这类查询需使用 like 模式。
+"""
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.engine import Connection
+from backend.models import Shop, ShopSearchToken
+from backend.tokenizer import (
+    shop_tokens, keyword_gram_tokens, pinyin_full, pinyin_initials,
+    INITIALS_PREFIX, FULL_PINYIN_PREFIX
+)
+from typing import Iterable, List, Set
+
+# 参与索引的店铺字段，任一字段变化都需要重建该店铺的词项
+INDEXED_FIELDS = ("name", "category", "name_pinyin", "category_pinyin")
+
+
+def tokens_for_shop(shop: Shop) -> Set[str]:
+    return shop_tokens(shop.name, shop.category, shop.name_pinyin, shop.category_pinyin)
+
+
+def remove_shop_tokens(connection: Connection, shop_id: int):
+    connection.execute(
+        delete(ShopSearchToken.__table__).where(ShopSearchToken.shop_id == shop_id)
+    )
+
+
+def sync_shop_tokens(connection: Connection, shop: Shop):
+    """
+    重建单个店铺的词项（在店铺写入的同一事务中执行）。
+    """
+    remove_shop_tokens(connection, shop.id)
+    tokens = tokens_for_shop(shop)
+    if tokens:
+        connection.execute(
+            insert(ShopSearchToken.__table__),
+            [{"token": token, "shop_id": shop.id} for token in tokens]
+        )
+
+
+def intersect_postings(tokens: Iterable[str]):
+    """
+    返回同时命中全部词项的 shop_id 子查询（posting list 求交）。
+    """
+    tokens = sorted(set(tokens))
+    return (
+        select(ShopSearchToken.shop_id)
+        .where(ShopSearchToken.token.in_(tokens))
+        .group_by(ShopSearchToken.shop_id)
+        .having(func.count() == len(tokens))
+    )
+
+
+def like_keyword_clause(keyword: str, keyword_pinyin: str):
+    """
+    原有的四字段模糊匹配条件。
+    """
+    return (
+        (Shop.name.ilike(f"%{keyword}%")) |
+        (Shop.category.ilike(f"%{keyword}%")) |
+        (Shop.name_pinyin.ilike(f"%{keyword_pinyin}%")) |
+        (Shop.category_pinyin.ilike(f"%{keyword_pinyin}%"))
+    )
+
+
+def keyword_match_clause(keyword: str, keyword_pinyin: str, pinyin_mode: bool = False):
+    """
+    关键词的逐行匹配条件：原有的四字段模糊匹配；拼音模式下额外匹配无空格全拼（"huoguo"、"kfcnanqu"）
+    与拼音首字母（"hg"），支持中英文混合输入（"ktv店"、"KFC南区"）。
+    """
+    clause = like_keyword_clause(keyword, keyword_pinyin)
+    if pinyin_mode:
+        keyword_full = pinyin_full(keyword)
+        keyword_initials = pinyin_initials(keyword)
+        if keyword_full:
+            clause = clause | Shop.name_pinyin_full.contains(keyword_full) | Shop.category_pinyin_full.contains(keyword_full)
+        if keyword_initials:
+            clause = clause | Shop.name_initials.contains(keyword_initials) | Shop.category_initials.contains(keyword_initials)
+    return clause
+
+
+def keyword_token_sets(keyword: str, keyword_pinyin: str, pinyin_mode: bool = False) -> List[Set[str]]:
+    """
+    每个匹配分支需要全部命中的词项组：原文与空格拼音的 "g:" 词项，
+    拼音模式下再加上无空格全拼的 "f:" 词项与首字母的 "i:" 词项。
+    某行满足某个分支的子串条件时，必然命中该分支的全部词项。
+    """
+    token_sets = [keyword_gram_tokens(keyword), keyword_gram_tokens(keyword_pinyin)]
+    if pinyin_mode:
+        token_sets.append(keyword_gram_tokens(pinyin_full(keyword), FULL_PINYIN_PREFIX))
+        token_sets.append(keyword_gram_tokens(pinyin_initials(keyword), INITIALS_PREFIX))
+    unique = {frozenset(tokens) for tokens in token_sets if tokens}
+    return [set(tokens) for tokens in sorted(unique, key=sorted)]
+
+
+def keyword_candidates(token_sets: List[Set[str]]):
+    """
+    候选店铺 ID 派生表：各词项组的 posting list 求交后取并集（UNION 去重，连接时不会产生重复行）。
+    """
+    queries = [intersect_postings(tokens) for tokens in token_sets]
+    candidates = queries[0].union(*queries[1:]) if len(queries) > 1 else queries[0]
+    return candidates.subquery("keyword_candidates")
+
+
+def apply_keyword_search(query, keyword: str, keyword_pinyin: str, search_mode: str = "index"):
+    """
+    为店铺查询加上关键词条件，结果与直接使用 keyword_match_clause 逐行匹配一致。
+    index / pinyin 模式下 shops 与候选店铺 ID 派生表连接：先由词项 posting list 得到候选，
+    再按主键取出店铺并只在候选行上校验子串条件，不再扫描 shops 全表。
+    like 模式，或关键词含 LIKE 通配符（无法用 n-gram 表达）时，退回逐行匹配。
+    """
+    pinyin_mode = search_mode == "pinyin"
+    clause = keyword_match_clause(keyword, keyword_pinyin, pinyin_mode)
+    if search_mode == "like" or any(ch in keyword + keyword_pinyin for ch in "%_\\"):
+        return query.where(clause)
+
+    token_sets = keyword_token_sets(keyword, keyword_pinyin, pinyin_mode)
+    if not token_sets:
+        return query.where(clause)
+    candidates = keyword_candidates(token_sets)
+    return query.join(candidates, Shop.id == candidates.c.shop_id).where(clause)
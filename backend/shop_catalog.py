@@ -0,0 +1,106 @@
+"""
+店铺数值属性的列式内存快照（NumPy）。
+快照按 id 升序保存 id / rating / avg_cost 三列，并预先计算各排序方式的置换数组；
+/api/filter 与 /api/sort 通过向量化掩码与切片得到当前页的店铺 ID，只回表读取这一页。
+店铺变更提交后快照标记为过期，下次读取时重新加载（仅查询三列）。
+"""
+import asyncio
+import numpy as np
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import Shop
+from backend.catalog_events import CatalogObserver
+
+
+class ColumnarShopCatalog(CatalogObserver):
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.rating = np.empty(0, dtype=np.float64)
+        self.avg_cost = np.empty(0, dtype=np.float64)
+        self.orderings: Dict[str, np.ndarray] = {}
+        self._stale = True
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def load(self, rows):
+        """
+        由 (id, rating, avg_cost) 行构建快照，rows 需按 id 升序。
+        """
+        data = np.array(
+            [(r[0], np.nan if r[1] is None else r[1], np.nan if r[2] is None else r[2]) for r in rows],
+            dtype=np.float64
+        ).reshape(-1, 3)
+        self.ids = data[:, 0].astype(np.int64)
+        # rating / avg_cost 在 MySQL 中为单精度 FLOAT，驱动返回的是其十进制文本。
+        # 先舍入到单精度再比较，与 SQL 中 "rating >= 4.1"（4.0999999 >= 4.1 为假）的结果一致
+        self.rating = data[:, 1].astype(np.float32).astype(np.float64)
+        self.avg_cost = data[:, 2].astype(np.float32).astype(np.float64)
+
+        # 稳定排序，同值按 id 升序；NULL 的位置与 MySQL 一致（降序排最后、升序排最前）
+        self.orderings = {
+            "rating": np.argsort(-np.nan_to_num(self.rating, nan=-np.inf), kind="stable"),
+            "avg_spend": np.argsort(np.nan_to_num(self.avg_cost, nan=-np.inf), kind="stable"),
+            "default": np.arange(len(self.ids))[::-1],
+        }
+
+    async def ensure_fresh(self, db: AsyncSession):
+        if not self._stale:
+            return
+        async with self._lock:
+            if self._stale:
+                # 加载期间若再次发生变更，保持过期状态，下次读取时重新加载
+                generation = self._generation
+                result = await db.execute(
+                    select(Shop.id, Shop.rating, Shop.avg_cost).order_by(Shop.id)
+                )
+                self.load(result.all())
+                self._stale = generation != self._generation
+
+    def mark_stale(self):
+        self._generation += 1
+        self._stale = True
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self.mark_stale()
+
+    def on_shop_deleted(self, shop_id: int):
+        self.mark_stale()
+
+    def filter_ids(self, rating: Optional[float] = None, cost_min: Optional[float] = None,
+                   cost_max: Optional[float] = None, offset: int = 0, limit: Optional[int] = None) -> List[int]:
+        """
+        按评分下限与人均消费区间筛选，返回 id 升序的一页店铺 ID。
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            if rating is not None:
+                mask &= self.rating >= rating
+            if cost_min is not None:
+                mask &= self.avg_cost >= cost_min
+            if cost_max is not None:
+                mask &= self.avg_cost <= cost_max
+        end = None if limit is None else offset + limit
+        return self.ids[mask][offset:end].tolist()
+
+    def sorted_ids(self, sort_by: str, offset: int = 0, limit: Optional[int] = None) -> List[int]:
+        """
+        按预排序置换数组切出一页店铺 ID。
+        """
+        end = None if limit is None else offset + limit
+        return self.ids[self.orderings[sort_by][offset:end]].tolist()
+
+
+async def load_shops_in_order(db: AsyncSession, shop_ids: List[int]) -> List[Shop]:
+    """
+    按给定 ID 顺序回表读取店铺（用于分页后的一页 ID，调用方需限制 ID 数量）。
+    """
+    if not shop_ids:
+        return []
+    result = await db.execute(select(Shop).where(Shop.id.in_(shop_ids)))
+    shops = {shop.id: shop for shop in result.scalars().all()}
+    return [shops[shop_id] for shop_id in shop_ids if shop_id in shops]
+
+
+# 进程内单例
+shop_catalog = ColumnarShopCatalog()
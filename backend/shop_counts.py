@@ -0,0 +1,129 @@
+"""
+店铺搜索总数缓存与估算。
+- ShopCountCache：按规范化后的筛选条件缓存精确 count 结果，短 TTL，店铺变更时整体失效。
+- ShopHistogram：按 (品类, 评分档) 维护的店铺数量直方图，店铺写入后增量更新，
+  仅含品类 / 评分下限筛选时可直接估算总数，无需查询数据库。
+"""
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import Shop
+from backend.catalog_events import CatalogObserver
+
+
+def rating_bucket(rating: Optional[float]) -> Optional[int]:
+    """
+    评分按 0.1 分档（4.5 -> 45）。
+    """
+    return None if rating is None else int(round(rating * 10))
+
+
+def count_cache_key(**filters) -> Tuple:
+    """
+    将筛选条件规范化为缓存键：去掉空值，列表排序去重，字符串统一小写。
+    """
+    items = []
+    for name, value in sorted(filters.items()):
+        if value is None or value == [] or value is False:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(set(value)))
+        elif isinstance(value, str):
+            value = value.strip().lower()
+        items.append((name, value))
+    return tuple(items)
+
+
+class ShopCountCache(CatalogObserver):
+    def __init__(self, ttl: float = 30.0, max_entries: int = 2048):
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+
+    def get(self, key: Hashable) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, total = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return total
+
+    def set(self, key: Hashable, total: int):
+        if len(self._entries) >= self._max_entries:
+            # 先清理过期项，仍然超限则淘汰最早写入的一项
+            now = time.monotonic()
+            for k in [k for k, (exp, _) in self._entries.items() if exp < now]:
+                del self._entries[k]
+            if len(self._entries) >= self._max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic() + self._ttl, total)
+
+    def clear(self):
+        self._entries.clear()
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self.clear()
+
+    def on_shop_deleted(self, shop_id: int):
+        self.clear()
+
+
+class ShopHistogram(CatalogObserver):
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._shop_keys: Dict[int, Tuple[Optional[str], Optional[int]]] = {}
+        self.ready = False
+
+    async def build(self, db: AsyncSession):
+        """
+        从数据库全量构建直方图（应用启动时调用）。
+        """
+        result = await db.execute(select(Shop.id, Shop.category, Shop.rating))
+        self._counts = Counter()
+        self._shop_keys = {}
+        for shop_id, category, rating in result.all():
+            self._put(shop_id, category, rating)
+        self.ready = True
+
+    def _put(self, shop_id: int, category: Optional[str], rating: Optional[float]):
+        self._remove(shop_id)
+        key = (category, rating_bucket(rating))
+        self._shop_keys[shop_id] = key
+        self._counts[key] += 1
+
+    def _remove(self, shop_id: int):
+        key = self._shop_keys.pop(shop_id, None)
+        if key is not None:
+            self._counts[key] -= 1
+            if self._counts[key] <= 0:
+                del self._counts[key]
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self._put(shop["id"], shop["category"], shop["rating"])
+
+    def on_shop_deleted(self, shop_id: int):
+        self._remove(shop_id)
+
+    def estimate(self, categories: Optional[Iterable[str]] = None, rating_floor: Optional[float] = None) -> Optional[int]:
+        """
+        估算满足品类与评分下限条件的店铺数；直方图尚未构建时返回 None。
+        """
+        if not self.ready:
+            return None
+        category_set = set(categories) if categories is not None else None
+        min_bucket = math.ceil(rating_floor * 10 - 1e-9) if rating_floor is not None else None
+        return sum(
+            count for (category, bucket), count in self._counts.items()
+            if (category_set is None or category in category_set)
+            and (min_bucket is None or (bucket is not None and bucket >= min_bucket))
+        )
+
+
+# 进程内单例
+shop_count_cache = ShopCountCache()
+shop_histogram = ShopHistogram()
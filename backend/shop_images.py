@@ -0,0 +1,101 @@
+"""
+店铺详情图片分页。
+- shop_detail_statement：一条语句取出店铺行、图片总数（标量子查询）与当前页图片（row_number 窗口函数）。
+- ShopImageCache：按店铺缓存图片列表的分页结果与总数（LRU），图片或店铺变更提交后失效。
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import Shop, ShopImage
+from backend.catalog_events import CatalogObserver
+
+ImagePage = Tuple[int, List[Dict[str, Any]]]
+
+
+def shop_detail_statement(shop_id: int, image_page: int, image_page_size: int):
+    """
+    店铺 LEFT JOIN 当前页图片；店铺不存在时无结果行，没有图片（或页码越界）时只有一行且图片列为 NULL。
+    """
+    start = (image_page - 1) * image_page_size
+    total_images = (
+        select(func.count(ShopImage.id))
+        .where(ShopImage.shop_id == Shop.id)
+        .correlate(Shop)
+        .scalar_subquery()
+    )
+    ranked = (
+        select(
+            ShopImage.shop_id,
+            ShopImage.id.label("image_id"),
+            ShopImage.image_url,
+            func.row_number().over(order_by=ShopImage.id).label("rn")
+        )
+        .where(ShopImage.shop_id == shop_id)
+        .subquery()
+    )
+    return (
+        select(Shop, total_images.label("total_images"), ranked.c.image_id, ranked.c.image_url)
+        .outerjoin(ranked, and_(
+            ranked.c.shop_id == Shop.id,
+            ranked.c.rn > start,
+            ranked.c.rn <= start + image_page_size
+        ))
+        .where(Shop.id == shop_id)
+        .order_by(ranked.c.rn)
+    )
+
+
+async def fetch_shop_with_images(
+    db: AsyncSession, shop_id: int, image_page: int, image_page_size: int
+) -> Tuple[Optional[Shop], Optional[ImagePage]]:
+    """
+    返回 (店铺, (图片总数, 当前页图片))；店铺不存在时返回 (None, None)。
+    """
+    rows = (await db.execute(shop_detail_statement(shop_id, image_page, image_page_size))).all()
+    if not rows:
+        return None, None
+    images = [
+        {"id": row.image_id, "image_url": row.image_url}
+        for row in rows if row.image_id is not None
+    ]
+    return rows[0][0], (rows[0].total_images, images)
+
+
+class ShopImageCache(CatalogObserver):
+    def __init__(self, max_shops: int = 1024, max_pages_per_shop: int = 32):
+        self._max_shops = max_shops
+        self._max_pages_per_shop = max_pages_per_shop
+        self._entries: "OrderedDict[int, Dict[Tuple[int, int], ImagePage]]" = OrderedDict()
+
+    def get(self, shop_id: int, page: int, page_size: int) -> Optional[ImagePage]:
+        pages = self._entries.get(shop_id)
+        if pages is None:
+            return None
+        self._entries.move_to_end(shop_id)
+        return pages.get((page, page_size))
+
+    def set(self, shop_id: int, page: int, page_size: int, value: ImagePage):
+        pages = self._entries.setdefault(shop_id, {})
+        self._entries.move_to_end(shop_id)
+        if len(pages) >= self._max_pages_per_shop:
+            pages.clear()
+        pages[(page, page_size)] = value
+        while len(self._entries) > self._max_shops:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, shop_id: int):
+        self._entries.pop(shop_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def on_shop_images_changed(self, shop_id: int):
+        self.invalidate(shop_id)
+
+    def on_shop_deleted(self, shop_id: int):
+        self.invalidate(shop_id)
+
+
+# 进程内单例
+shop_image_cache = ShopImageCache()
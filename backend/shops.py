@@ -1,110 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_, func, Float
+from sqlalchemy import and_, or_, func, Float
 from sqlalchemy import join
+from sqlalchemy.orm import aliased
 from backend.database import get_db
-from backend.models import Shop, SearchHistory, ShopImage, Package, Order
+from backend.pagination import paginate_query, keyset_order_by
+from backend.models import Shop, SearchHistory, ShopImage, Package, Order, CatalogVersion
 from backend.schema import Shop as ShopSchema, Package as PackageSchema, Order as OrderSchema
 from backend.login import get_current_user  # 导入 get_current_user
+from backend.business_hours import parse_business_hours, is_open_at, minute_of_day
+from backend.suggest import suggest_index
+from backend.search_history import search_history_buffer
+from backend.shop_counts import shop_count_cache, shop_histogram, count_cache_key
+from backend.cache import detail_cache
+from backend.search_cache import search_response_cache
+from backend.conditional import weak_etag, etag_matches, set_validators, not_modified
+from backend.shop_images import shop_image_cache, fetch_shop_with_images
+from backend.search_index import apply_keyword_search
 from datetime import datetime, timezone, timedelta, time
 from sqlalchemy import delete
 from pypinyin import pinyin, Style
 from typing import List, Dict, Any
 
-# 提取分页逻辑
-async def paginate_query(
-    db: AsyncSession,
-    query,
-    page: int,
-    page_size: int,
-    return_scalars: bool = True
-) -> Dict[str, Any]:
-    count_query = query.with_only_columns(func.count()).order_by(None)
-    total = await db.scalar(count_query)
-
-    query = query.offset((page - 1) * page_size).limit(page_size)
-    result = await db.execute(query)
-    
-    if return_scalars:
-        items = result.scalars().all()
-    else:
-        items = result.all()
-
-    return {
-        "total": total,
-        "page": page,
-        "page_size": page_size,
-        "data": items
-    }
-
 router = APIRouter()
 
 def is_shop_open(business_hours: str, current_time: datetime) -> bool:
-    try:
-        open_time_str, close_time_str = business_hours.split('-')
-        open_hour, open_minute = map(int, open_time_str.split(':'))
-        close_hour, close_minute = map(int, close_time_str.split(':'))
-        
-        open_time = time(open_hour, open_minute)
-        close_time = time(close_hour, close_minute)
-        current_time_only = time(current_time.hour, current_time.minute)
-        
-        if close_time < open_time:
-            return current_time_only >= open_time or current_time_only <= close_time
-        else:
-            return open_time <= current_time_only <= close_time
-    except Exception as e:
-        print(f"Error parsing business hours '{business_hours}': {e}")
+    hours = parse_business_hours(business_hours)
+    if hours is None:
+        print(f"Error parsing business hours '{business_hours}'")
         return False
+    return is_open_at(*hours, minute_of_day(current_time))
+
+def shop_open_clause(current_time: datetime):
+    """
+    基于预解析的 open_minute / close_minute 列构造 "当前营业中" 的 SQL 条件（支持跨夜营业）。
+    """
+    minute = minute_of_day(current_time)
+    return or_(
+        and_(
+            Shop.open_minute <= Shop.close_minute,
+            Shop.open_minute <= minute,
+            Shop.close_minute >= minute
+        ),
+        and_(
+            Shop.close_minute < Shop.open_minute,
+            or_(Shop.open_minute <= minute, Shop.close_minute >= minute)
+        )
+    )
 
-@router.get("/shops/search")
-async def search_shops(
+async def load_shop_image_urls(db: AsyncSession, shop_ids: List[int]) -> Dict[int, List[str]]:
+    """
+    批量获取多个店铺的图片 URL，返回 shop_id -> [image_url] 映射。
+    """
+    if not shop_ids:
+        return {}
+
+    result = await db.execute(
+        select(ShopImage.shop_id, ShopImage.image_url)
+        .where(ShopImage.shop_id.in_(shop_ids))
+        .order_by(ShopImage.shop_id, ShopImage.id)
+    )
+    image_map: Dict[int, List[str]] = {}
+    for shop_id, image_url in result.all():
+        image_map.setdefault(shop_id, []).append(image_url)
+    return image_map
+
+async def run_shop_search(
+    db: AsyncSession,
     keyword: str | None = None,
-    categories: list[str] = Query(None),
-    ratings: list[float] = Query(None),
+    categories: list[str] | None = None,
+    ratings: list[float] | None = None,
     category: str | None = None,
-    rating: float | None = Query(None, gt=0.0, le=5.0),
-    avg_cost_min: float | None = Query(None, gt=0),
-    avg_cost_max: float | None = Query(None, gt=0),
-    is_open: bool | None = Query(None),
-    sort_by: str = Query('default', regex="^(default|rating|avg_cost)$"),
-    sort_order: str = Query('desc', regex="^(asc|desc)$"),
+    rating: float | None = None,
+    avg_cost_min: float | None = None,
+    avg_cost_max: float | None = None,
+    is_open: bool | None = None,
+    sort_by: str = 'default',
+    sort_order: str = 'desc',
+    search_mode: str = 'index',
     page: int = 1,
     page_size: int = 10,
-    db: AsyncSession = Depends(get_db)
-):
+    cursor: str | None = None,
+    count_mode: str = 'cached'
+) -> Dict[str, Any]:
+    """
+    执行店铺搜索并返回响应数据（不含搜索历史记录与响应缓存）。
+    """
     # Initialize base query for all shops
     query = select(Shop)
     
     # Only add search filtering if keyword is provided
     if keyword:
-        print(f"Received keyword: {keyword}")
-        existing_history = await db.execute(
-            select(SearchHistory).where(SearchHistory.keyword == keyword)
-        )
-        existing_history = existing_history.scalars().first()
-
-        if existing_history:
-            existing_history.searched_at = datetime.utcnow()
-            await db.commit()
-            await db.refresh(existing_history)
-        else:
-            new_history = SearchHistory(keyword=keyword)
-            db.add(new_history)
-            await db.commit()
-            await db.refresh(new_history)
-
         keyword_pinyin_list = pinyin(keyword, style=Style.NORMAL)
         keyword_pinyin = ' '.join([item[0] for item in keyword_pinyin_list])
         print(f"Keyword pinyin: {keyword_pinyin}")
 
-        query = query.where(
-            (Shop.name.ilike(f"%{keyword}%")) |
-            (Shop.category.ilike(f"%{keyword}%")) |
-            (Shop.name_pinyin.ilike(f"%{keyword_pinyin}%")) |
-            (Shop.category_pinyin.ilike(f"%{keyword_pinyin}%"))
-        )
+        query = apply_keyword_search(query, keyword, keyword_pinyin, search_mode)
 
     # Apply other filters
     if category:
@@ -125,45 +118,56 @@ async def search_shops(
         query = query.where(Shop.avg_cost <= avg_cost_max)
     if is_open is True:
         print("Applying is_open filter")
-        current_time = datetime.utcnow()
-        result = await db.execute(query)
-        shops = result.scalars().all()
-        open_shop_ids = [
-            shop.id for shop in shops
-            if is_shop_open(shop.business_hours, current_time)
-        ]
-        if open_shop_ids:
-            query = query.where(Shop.id.in_(open_shop_ids))
-        else:
-            query = query.where(Shop.id == -1)
+        query = query.where(shop_open_clause(datetime.utcnow()))
 
     print(f"Sorting parameters: sort_by={sort_by}, sort_order={sort_order}")
-    if sort_by == 'rating':
-        if sort_order == 'desc':
-            query = query.order_by(Shop.rating.desc())
-        else:
-            query = query.order_by(Shop.rating.asc())
-    elif sort_by == 'avg_cost':
-        if sort_order == 'desc':
-            query = query.order_by(Shop.avg_cost.desc())
-        else:
-            query = query.order_by(Shop.avg_cost.asc())
-    else:
-        if sort_order == 'desc':
-            query = query.order_by(Shop.id.desc())
-        else:
-            query = query.order_by(Shop.id.asc())
-
-    result = await paginate_query(db, query, page, page_size)
+    # 排序键：排序字段 + 主键兜底，保证翻页稳定，同时作为游标分页的 keyset
+    sort_column = {'rating': Shop.rating, 'avg_cost': Shop.avg_cost}.get(sort_by)
+    keyset = [(sort_column, sort_order)] if sort_column is not None else []
+    keyset.append((Shop.id, sort_order))
+    query = query.order_by(*keyset_order_by(keyset))
+
+    # 总数：游标分页时跳过；approx 模式在仅有品类/评分筛选时由直方图估算；否则走短 TTL 缓存
+    total, total_estimated, count_key = None, False, None
+    if cursor is None:
+        only_histogram_filters = not (keyword or avg_cost_min or avg_cost_max or is_open)
+        if count_mode == 'approx' and only_histogram_filters:
+            category_set = None
+            if category:
+                category_set = {category}
+            if categories:
+                category_set = set(categories) if category_set is None else category_set & set(categories)
+            rating_floor = max([r for r in (rating, ratings[0] if ratings else None) if r], default=None)
+            total = shop_histogram.estimate(category_set, rating_floor)
+            total_estimated = total is not None
+        if total is None and count_mode != 'exact':
+            count_key = count_cache_key(
+                keyword=keyword, search_mode=search_mode if keyword else None,
+                category=category, categories=categories, rating=rating,
+                ratings=ratings[:1] if ratings else None,
+                avg_cost_min=avg_cost_min, avg_cost_max=avg_cost_max,
+                # 营业状态随时间变化，按分钟区分
+                is_open=minute_of_day(datetime.utcnow()) if is_open else None
+            )
+            total = shop_count_cache.get(count_key)
+
+    result = await paginate_query(
+        db, query, page, page_size, cursor=cursor, keyset=keyset,
+        with_total=cursor is None and total is None
+    )
+    if total is None:
+        total = result["total"]
+        if count_key is not None and total is not None:
+            shop_count_cache.set(count_key, total)
     shops = result["data"]
 
+    # 一次性批量查询本页所有店铺的图片，避免每个店铺单独查询（N+1）
+    image_map = await load_shop_image_urls(db, [shop.id for shop in shops])
+
     shop_data = []
     current_time = datetime.utcnow()
     for shop in shops:
-        image_query = select(ShopImage).where(ShopImage.shop_id == shop.id)
-        image_result = await db.execute(image_query)
-        images = image_result.scalars().all()
-        image_urls = [image.image_url for image in images] if images else ["https://via.placeholder.com/150"]
+        image_urls = image_map.get(shop.id) or ["https://via.placeholder.com/150"]
 
         is_open_now = is_shop_open(shop.business_hours, current_time)
 
@@ -184,139 +188,285 @@ async def search_shops(
         })
 
     return {
-        "total": result["total"],
+        "total": total,
+        "total_estimated": total_estimated,
         "page": result["page"],
         "page_size": result["page_size"],
+        "next_cursor": result.get("next_cursor"),
         "data": shop_data
     }
 
+@router.get("/shops/search")
+async def search_shops(
+    request: Request,
+    keyword: str | None = None,
+    categories: list[str] = Query(None),
+    ratings: list[float] = Query(None),
+    category: str | None = None,
+    rating: float | None = Query(None, gt=0.0, le=5.0),
+    avg_cost_min: float | None = Query(None, gt=0),
+    avg_cost_max: float | None = Query(None, gt=0),
+    is_open: bool | None = Query(None),
+    sort_by: str = Query('default', regex="^(default|rating|avg_cost)$"),
+    sort_order: str = Query('desc', regex="^(asc|desc)$"),
+    search_mode: str = Query('index', regex="^(index|pinyin|like)$"),
+    page: int = 1,
+    page_size: int = 10,
+    cursor: str | None = Query(None, description="游标分页：首页传空字符串，之后传上一页返回的 next_cursor"),
+    count_mode: str = Query('cached', regex="^(exact|cached|approx)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    if keyword:
+        print(f"Received keyword: {keyword}")
+        # 搜索历史先写入内存缓冲，由后台任务批量落库（命中响应缓存时同样记录）
+        search_history_buffer.record(keyword)
+
+    # 整页响应缓存键：规范化后的查询参数 + 当前分钟（营业状态随时间变化）
+    cache_key = (
+        keyword, tuple(sorted(set(categories))) if categories else None,
+        tuple(ratings) if ratings else None, category, rating, avg_cost_min, avg_cost_max,
+        is_open, sort_by, sort_order, search_mode, page, page_size, cursor, count_mode,
+        datetime.utcnow().strftime("%Y%m%d%H%M")
+    )
+
+    async def render():
+        # ETag 由目录版本戳（店铺及图片每次变更时递增，按主键读取一行）与缓存键计算，多进程间一致
+        catalog_version = (await db.execute(
+            select(CatalogVersion.version).where(CatalogVersion.name == "shops")
+        )).scalar()
+        etag = weak_etag("search", cache_key, catalog_version)
+        payload = await run_shop_search(
+            db, keyword=keyword, categories=categories, ratings=ratings, category=category,
+            rating=rating, avg_cost_min=avg_cost_min, avg_cost_max=avg_cost_max, is_open=is_open,
+            sort_by=sort_by, sort_order=sort_order, search_mode=search_mode, page=page,
+            page_size=page_size, cursor=cursor, count_mode=count_mode
+        )
+        return etag, JSONResponse(content=payload).body
+
+    # 相同参数的并发请求只查询一次，其余请求共享结果
+    etag, body = await search_response_cache.get_or_compute(cache_key, render)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 @router.get("/shops/search/history", response_model=list[str])
 async def get_search_history(
     limit: int = Query(10, ge=1, le=50),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
-        select(SearchHistory.keyword)
+        select(SearchHistory.keyword, SearchHistory.searched_at)
         .order_by(SearchHistory.searched_at.desc())
         .limit(limit)
     )
-    history = result.scalars().all()
+    # 合并尚未落库的缓冲记录，保证刚搜索过的关键词立即可见
+    latest: Dict[str, datetime] = {}
+    for keyword, searched_at in list(result.all()) + search_history_buffer.pending():
+        if searched_at and (keyword not in latest or latest[keyword] < searched_at):
+            latest[keyword] = searched_at
+    history = sorted(latest, key=latest.get, reverse=True)[:limit]
     return history
 
 @router.delete("/shops/search/history")
 async def clear_search_history(db: AsyncSession = Depends(get_db)):
+    search_history_buffer.clear()
     await db.execute(delete(SearchHistory))
     await db.commit()
     return {"message": "Search history cleared"}
 
+@router.get("/shops/suggest")
+async def suggest_shops(
+    q: str = Query(..., min_length=1, max_length=50),
+    limit: int = Query(10, ge=1, le=20)
+):
+    """
+    搜索框联想：按汉字、全拼或首字母前缀返回店铺名与品类（由进程内索引直接返回，不查询数据库）。
+    """
+    return suggest_index.suggest(q, limit)
+
+def shop_detail_dict(shop: Shop) -> Dict[str, Any]:
+    return {
+        "id": shop.id,
+        "name": shop.name,
+        "category": shop.category,
+        "rating": shop.rating,
+        "price_range": shop.price_range,
+        "avg_cost": shop.avg_cost,
+        "address": shop.address,
+        "phone": shop.phone,
+        "business_hours": shop.business_hours,
+        "image_url": shop.image_url
+    }
+
+def _isoformat(value: datetime | None) -> str | None:
+    # 缓存值需可 JSON 序列化，时间以 ISO 字符串保存
+    return value.isoformat() if value else None
+
+def _parse_iso(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
 @router.get("/shops/{shop_id}")
 async def get_shop_detail(
     shop_id: int,
+    request: Request,
+    response: Response,
     image_page: int = Query(1, ge=1),
     image_page_size: int = Query(1, ge=1),
     db: AsyncSession = Depends(get_db)
 ):
-    shop_query = select(Shop).where(Shop.id == shop_id)
-    shop_result = await db.execute(shop_query)
-    shop = shop_result.scalars().first()
+    image_page_data = shop_image_cache.get(shop_id, image_page, image_page_size)
+    images_loaded = False
+
+    async def load_shop():
+        # 图片分页命中缓存时只需按主键读取店铺；否则店铺、图片总数与当前页图片一条语句取回
+        nonlocal image_page_data, images_loaded
+        if image_page_data is None:
+            shop, image_page_data = await fetch_shop_with_images(db, shop_id, image_page, image_page_size)
+            images_loaded = True
+        else:
+            shop = await db.get(Shop, shop_id)
+        if not shop:
+            return None
+        return {"shop": shop_detail_dict(shop), "version": shop.version, "updated_at": _isoformat(shop.updated_at)}
 
-    if not shop:
+    entry = await detail_cache.get_or_load("shop", shop_id, load_shop)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Shop not found")
 
-    image_query = select(ShopImage).where(ShopImage.shop_id == shop_id)
-    count_query = select(func.count()).select_from(image_query.subquery())
-    total_images_result = await db.execute(count_query)
-    total_images = total_images_result.scalar()
+    # 图片变更会递增店铺版本号，ETag 由版本号与图片分页参数决定
+    etag = weak_etag("shop", shop_id, entry["version"], image_page, image_page_size)
+    last_modified = _parse_iso(entry["updated_at"])
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
+
+    if image_page_data is None:
+        # 店铺命中缓存而图片分页未命中
+        shop, image_page_data = await fetch_shop_with_images(db, shop_id, image_page, image_page_size)
+        images_loaded = True
+        if not shop:
+            raise HTTPException(status_code=404, detail="Shop not found")
 
-    image_query = image_query.offset((image_page - 1) * image_page_size).limit(image_page_size)
-    image_result = await db.execute(image_query)
-    images = image_result.scalars().all()
+    if images_loaded:
+        shop_image_cache.set(shop_id, image_page, image_page_size, image_page_data)
+    total_images, images = image_page_data
 
+    set_validators(response, etag, last_modified)
     return {
-        "shop": {
-            "id": shop.id,
-            "name": shop.name,
-            "category": shop.category,
-            "rating": shop.rating,
-            "price_range": shop.price_range,
-            "avg_cost": shop.avg_cost,
-            "address": shop.address,
-            "phone": shop.phone,
-            "business_hours": shop.business_hours,
-            "image_url": shop.image_url
-        },
+        "shop": entry["shop"],
         "images": {
             "total": total_images,
             "page": image_page,
             "page_size": image_page_size,
-            "data": [{"id": img.id, "image_url": img.image_url} for img in images]
+            "data": images
         }
     }
 
+# 套餐按销量降序排列，同销量按 id 升序
+PACKAGE_POPULARITY_ORDER = (Package.sales.desc(), Package.id.asc())
+
 @router.get("/shops/{shop_id}/packages", response_model=List[PackageSchema])
 async def get_shop_packages(
     shop_id: int,
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Package).where(Package.shop_id == shop_id)
-    result = await db.execute(query)
-    packages = result.scalars().all()
+    # 在 SQL 中按 (shop_id, sales) 索引顺序分页，只读取当前页；下单会修改销量，列表不做缓存
+    query = select(Package).where(Package.shop_id == shop_id).order_by(*PACKAGE_POPULARITY_ORDER)
+    result = await paginate_query(db, query, page, page_size)
+    packages = result["data"]
+
+    if not result["total"]:
+        raise HTTPException(status_code=404, detail="Package not found")
 
-    if not packages:
-        return HTTPException(status_code=404, detail="Package not found")
+    etag = weak_etag(
+        "packages", shop_id, ",".join(f"{package.id}.{package.version}" for package in packages),
+        result["total"], page, page_size
+    )
+    last_modified = max((p.updated_at for p in packages if p.updated_at), default=None)
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
 
+    set_validators(response, etag, last_modified)
+    # 总数通过响应头返回，保持响应体为套餐列表
+    response.headers["X-Total-Count"] = str(result["total"])
     return packages
 
+def top_packages_statement(shop_ids: List[int], per_shop: int):
+    """
+    按店铺分区、销量降序编号，每店取前 per_shop 个套餐。
+    """
+    ranked = (
+        select(
+            Package,
+            func.row_number().over(
+                partition_by=Package.shop_id, order_by=PACKAGE_POPULARITY_ORDER
+            ).label("rn")
+        )
+        .where(Package.shop_id.in_(set(shop_ids)))
+        .subquery()
+    )
+    ranked_package = aliased(Package, ranked)
+    return (
+        select(ranked_package)
+        .where(ranked.c.rn <= per_shop)
+        .order_by(ranked.c.shop_id, ranked.c.rn)
+    )
+
+@router.get("/packages/by-shops", response_model=Dict[int, List[PackageSchema]])
+async def get_packages_by_shops(
+    shop_ids: List[int] = Query(..., max_length=100),
+    per_shop: int = Query(1, ge=1, le=10),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量获取多个店铺的热销套餐（每店按销量取前 per_shop 个），供搜索页一次请求展示。
+    """
+    result = await db.execute(top_packages_statement(shop_ids, per_shop))
+
+    packages_by_shop: Dict[int, List[Package]] = {shop_id: [] for shop_id in shop_ids}
+    for package in result.scalars().all():
+        packages_by_shop[package.shop_id].append(package)
+    return packages_by_shop
+
 @router.get("/packages/{package_id}", response_model=PackageSchema)
 async def get_package_detail(
     package_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db)
 ):
-    query = select(Package).where(Package.id == package_id)
-    result = await db.execute(query)
-    package = result.scalars().first()
-
-    if not package:
-        raise HTTPException(status_code=404, detail="Package not found")
+    async def load_package():
+        package = await db.get(Package, package_id)
+        if not package:
+            return None
+        return {
+            "package": PackageSchema.model_validate(package).model_dump(),
+            "version": package.version,
+            "updated_at": _isoformat(package.updated_at)
+        }
 
-    return package
+    entry = await detail_cache.get_or_load("package", package_id, load_package)
 
-@router.get("/user/orders", response_model=Dict[str, Any])
-async def get_user_orders(
-    request: Request,
-    page: int = Query(1, ge=1),
-    page_size: int = Query(10, ge=1),
-    db: AsyncSession = Depends(get_db),
-    current_user: Dict[str, any] = Depends(get_current_user)
-):
-    user_id = current_user["id"]
-    query = (
-        select(Order, Package.title, Shop.name)
-        .join(Package, Order.package_id == Package.id)
-        .join(Shop, Package.shop_id == Shop.id)
-        .where(Order.user_id == user_id)
-        .order_by(Order.created_at.desc())
-    )
+    if not entry:
+        raise HTTPException(status_code=404, detail="Package not found")
 
-    result = await paginate_query(db, query, page, page_size, return_scalars=False)
-    orders = result["data"]
+    etag = weak_etag("package", package_id, entry["version"])
+    last_modified = _parse_iso(entry["updated_at"])
+    if etag_matches(request, etag):
+        return not_modified(etag, last_modified)
 
-    order_data = [
-        OrderSchema(
-            package_title=order[1],
-            created_at=order[0].created_at,
-            shop_name=order[2],
-            order_id=order[0].id
-        )
-        for order in orders
-    ]
+    set_validators(response, etag, last_modified)
+    return entry["package"]
 
-    return {
-        "total": result["total"],
-        "page": result["page"],
-        "page_size": result["page_size"],
-        "data": order_data
-    }
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    详情缓存的命中 / 未命中统计。
+    """
+    return detail_cache.stats()
 
 @router.get("/orders/{order_id}", response_model=OrderSchema)
 async def get_order_detail(
@@ -0,0 +1,186 @@
+"""
+搜索联想（前缀补全）索引。
+启动时从 shops / packages 表构建进程内的有序数组索引，键为店铺名称、品类的
+汉字、无空格全拼与拼音首字母；前缀查询通过二分定位，按评分与套餐销量排序返回。
+店铺、套餐变更后通过目录观察者增量刷新，无需重建。
+"""
+import heapq
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import Shop, Package
+from backend.catalog_events import CatalogObserver
+from backend.tokenizer import normalize, pinyin_full, pinyin_initials
+
+
+CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def suggest_keys(text: Optional[str]) -> Set[str]:
+    """
+    返回文本的全部可补全键：原文（小写）、无空格全拼、拼音首字母。
+    """
+    return {key for key in (normalize(text).strip(), pinyin_full(text), pinyin_initials(text)) if key}
+
+
+def query_keys(q: Optional[str]) -> Set[str]:
+    """
+    返回查询串用于前缀匹配的键。
+    只有不含汉字的输入才展开为全拼与首字母（如 "huo guo" -> "huoguo"）；含汉字的输入按原文匹配，
+    其中的拉丁字母部分只去掉空格与符号（"KFC 南区" -> "kfc南区"），
+    避免 "火" 展开为 "h" 后匹配到 "汉堡王"、"好利来" 等同首字母的店铺。
+    """
+    text = normalize(q).strip()
+    if not text:
+        return set()
+    if not CJK_PATTERN.search(text):
+        return suggest_keys(q)
+    return {key for key in (text, "".join(ch for ch in text if ch.isalnum())) if key}
+
+
+class SuggestIndex(CatalogObserver):
+    """
+    基于有序数组的前缀索引，数组元素为 (键, 条目 ID)。
+    条目 ID 形如 ("shop", shop_id) 或 ("category", 品类名)。
+    """
+    def __init__(self):
+        self._reset()
+        self.ready = False
+
+    def _reset(self):
+        self._keys: List[Tuple[str, Tuple[str, Any]]] = []
+        self._entry_keys: Dict[Tuple[str, Any], Set[str]] = {}
+        self._shops: Dict[int, Dict[str, Any]] = {}
+        self._package_sales: Dict[int, Tuple[int, int]] = {}  # package_id -> (shop_id, sales)
+        self._shop_sales: Dict[int, int] = defaultdict(int)
+        self._category_shops: Dict[str, Set[int]] = defaultdict(set)
+
+    # ---------------- 构建与增量维护 ---------------- #
+    async def build(self, db: AsyncSession):
+        """
+        从数据库全量构建索引（应用启动时调用）。
+        """
+        shops = (await db.execute(
+            select(Shop.id, Shop.name, Shop.category, Shop.rating)
+        )).all()
+        packages = (await db.execute(
+            select(Package.id, Package.shop_id, Package.sales)
+        )).all()
+
+        self._reset()
+        for package_id, shop_id, sales in packages:
+            self._set_package_sales(package_id, shop_id, sales or 0)
+        for shop_id, name, category, rating in shops:
+            self._put_shop(shop_id, name, category, rating)
+        self.ready = True
+
+    def _set_entry_keys(self, entry: Tuple[str, Any], keys: Set[str]):
+        old_keys = self._entry_keys.get(entry, set())
+        for key in old_keys - keys:
+            i = bisect_left(self._keys, (key, entry))
+            if i < len(self._keys) and self._keys[i] == (key, entry):
+                del self._keys[i]
+        for key in keys - old_keys:
+            insort(self._keys, (key, entry))
+        if keys:
+            self._entry_keys[entry] = keys
+        else:
+            self._entry_keys.pop(entry, None)
+
+    def _put_shop(self, shop_id: int, name: str, category: Optional[str], rating: Optional[float]):
+        old = self._shops.get(shop_id)
+        if old and old["category"] != category:
+            self._remove_from_category(shop_id, old["category"])
+
+        self._shops[shop_id] = {"name": name, "category": category, "rating": rating or 0.0}
+        self._set_entry_keys(("shop", shop_id), suggest_keys(name))
+        if category:
+            self._category_shops[category].add(shop_id)
+            self._set_entry_keys(("category", category), suggest_keys(category))
+
+    def _remove_from_category(self, shop_id: int, category: Optional[str]):
+        if not category:
+            return
+        self._category_shops[category].discard(shop_id)
+        if not self._category_shops[category]:
+            del self._category_shops[category]
+            self._set_entry_keys(("category", category), set())
+
+    def _set_package_sales(self, package_id: int, shop_id: int, sales: int):
+        old_shop_id, old_sales = self._package_sales.get(package_id, (shop_id, 0))
+        self._shop_sales[old_shop_id] -= old_sales
+        self._shop_sales[shop_id] += sales
+        self._package_sales[package_id] = (shop_id, sales)
+
+    def on_shop_changed(self, shop: Dict[str, Any]):
+        self._put_shop(shop["id"], shop["name"], shop["category"], shop["rating"])
+
+    def on_shop_deleted(self, shop_id: int):
+        old = self._shops.pop(shop_id, None)
+        if old:
+            self._remove_from_category(shop_id, old["category"])
+        self._set_entry_keys(("shop", shop_id), set())
+
+    def on_package_changed(self, package: Dict[str, Any]):
+        self._set_package_sales(package["id"], package["shop_id"], package["sales"] or 0)
+
+    def on_package_deleted(self, package: Dict[str, Any]):
+        shop_id, sales = self._package_sales.pop(package["id"], (package["shop_id"], 0))
+        self._shop_sales[shop_id] -= sales
+
+    # ---------------- 查询 ---------------- #
+    def _match_entries(self, prefix: str) -> Set[Tuple[str, Any]]:
+        entries = set()
+        i = bisect_left(self._keys, (prefix,))
+        while i < len(self._keys) and self._keys[i][0].startswith(prefix):
+            entries.add(self._keys[i][1])
+            i += 1
+        return entries
+
+    def suggest(self, q: str, limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        返回与前缀匹配的店铺与品类，按评分、套餐销量降序取前 limit 个。
+        """
+        entries: Set[Tuple[str, Any]] = set()
+        for prefix in query_keys(q):
+            entries |= self._match_entries(prefix)
+
+        shop_ids = [entry_id for kind, entry_id in entries if kind == "shop"]
+        categories = [entry_id for kind, entry_id in entries if kind == "category"]
+
+        top_shops = heapq.nlargest(
+            limit, shop_ids,
+            key=lambda sid: (self._shops[sid]["rating"], self._shop_sales[sid], -sid)
+        )
+        top_categories = heapq.nlargest(
+            limit, categories,
+            key=lambda c: (sum(self._shop_sales[sid] for sid in self._category_shops[c]),
+                           len(self._category_shops[c]))
+        )
+        return {
+            "shops": [
+                {
+                    "id": sid,
+                    "name": self._shops[sid]["name"],
+                    "category": self._shops[sid]["category"],
+                    "rating": self._shops[sid]["rating"],
+                    "sales": self._shop_sales[sid]
+                }
+                for sid in top_shops
+            ],
+            "categories": [
+                {
+                    "name": c,
+                    "shop_count": len(self._category_shops[c]),
+                    "sales": sum(self._shop_sales[sid] for sid in self._category_shops[c])
+                }
+                for c in top_categories
+            ]
+        }
+
+
+# 进程内单例
+suggest_index = SuggestIndex()
@@ -0,0 +1,102 @@
+"""
+店铺搜索分词模块。
+为倒排索引生成词项（token），所有词项都带有类型前缀：
+- "g:"  字段文本的单字与相邻二元组（n-gram），覆盖任意子串查询
+- "s:"  店铺名称与品类的拼音音节
+- "i:"  店铺名称、品类拼音首字母串的单字与二元组（如 "hg" -> 火锅）
+- "f:"  店铺名称、品类无空格全拼的单字与二元组（如 "huoguo"、"kfcnanqu"）
+"""
+import unicodedata
+from typing import Iterable, List, Optional, Set
+from pypinyin import lazy_pinyin, Style
+
+GRAM_PREFIX = "g:"
+SYLLABLE_PREFIX = "s:"
+INITIALS_PREFIX = "i:"
+FULL_PINYIN_PREFIX = "f:"
+
+# 词项列长度上限（与 ShopSearchToken.token 列一致）
+MAX_TOKEN_LENGTH = 32
+# MySQL 比较字符串时会忽略尾部空格，n-gram 中的空格统一替换为可见字符
+SPACE_MARK = "\u2423"
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    折叠大小写、重音与全角 / 半角形式（"Ｃａｆé" -> "cafe"），覆盖 MySQL 默认 *_ai_ci 排序规则中
+    常见的等价关系；折叠可以比排序规则更宽（只会使索引候选集变大）。
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return unicodedata.normalize("NFC", text).casefold()
+
+
+def char_ngrams(text: str) -> Set[str]:
+    """
+    返回文本的全部单字与相邻二元组。
+    """
+    text = text.replace(" ", SPACE_MARK)
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_ngrams(text: str) -> Set[str]:
+    """
+    返回查询串需要全部命中的 n-gram：单字查询用单字，其余用二元组。
+    包含某子串的文本必然包含该子串的全部二元组，因此二元组交集是子串匹配的必要条件。
+    """
+    text = text.replace(" ", SPACE_MARK)
+    if len(text) <= 1:
+        return set(text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def pinyin_syllables(text: Optional[str]) -> List[str]:
+    """
+    将文本转为拼音音节列表，非汉字片段按原样保留。
+    """
+    return [normalize(s).strip() for s in lazy_pinyin(text or "") if s.strip()]
+
+
+def pinyin_initials(text: Optional[str]) -> str:
+    """
+    返回文本的拼音首字母串，非汉字的字母数字片段完整保留（如 "KFC南区店" -> "kfcnqd"）。
+    """
+    return "".join(
+        ch for ch in normalize("".join(lazy_pinyin(text or "", style=Style.FIRST_LETTER)))
+        if ch.isalnum()
+    )
+
+
+def pinyin_full(text: Optional[str]) -> str:
+    """
+    返回文本的无空格全拼，非汉字的字母数字片段完整保留（如 "ktv店" -> "ktvdian"）。
+    """
+    return "".join(ch for ch in normalize("".join(lazy_pinyin(text or ""))) if ch.isalnum())
+
+
+def _prefixed(prefix: str, values: Iterable[str]) -> Set[str]:
+    return {prefix + v for v in values if v and len(prefix + v) <= MAX_TOKEN_LENGTH}
+
+
+def shop_tokens(name: Optional[str], category: Optional[str],
+                name_pinyin: Optional[str], category_pinyin: Optional[str]) -> Set[str]:
+    """
+    生成一个店铺的全部索引词项。
+    """
+    tokens: Set[str] = set()
+    for field in (name, category, name_pinyin, category_pinyin):
+        tokens |= _prefixed(GRAM_PREFIX, char_ngrams(normalize(field)))
+    tokens |= _prefixed(SYLLABLE_PREFIX, pinyin_syllables(name) + pinyin_syllables(category))
+    for field in (name, category):
+        tokens |= _prefixed(INITIALS_PREFIX, char_ngrams(pinyin_initials(field)))
+        tokens |= _prefixed(FULL_PINYIN_PREFIX, char_ngrams(pinyin_full(field)))
+    return tokens
+
+
+def keyword_gram_tokens(text: str, prefix: str = GRAM_PREFIX) -> Set[str]:
+    """
+    返回子串查询对应的词项集合（默认为 "g:" 词项）。
+    """
+    return _prefixed(prefix, query_ngrams(normalize(text)))
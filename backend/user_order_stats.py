@@ -0,0 +1,41 @@
+"""
+用户订单汇总（user_order_stats）的维护与读取。
+汇总行与订单在同一事务中更新：计数与消费金额用原子自增，并发下单不会丢失；
+用户首单时插入汇总行，并发首单导致主键冲突时改为自增。
+"""
+from datetime import datetime
+from sqlalchemy import update, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models import UserOrderStats
+
+
+async def record_user_orders(db: AsyncSession, user_id: int, count: int, amount: float, first_order_at: datetime):
+    """
+    登记用户新增的 count 笔订单（合计金额 amount，其中最早的下单时间为 first_order_at），不提交。
+    """
+    stats = UserOrderStats.__table__
+    increment = (
+        update(stats)
+        .where(stats.c.user_id == user_id)
+        .values(order_count=stats.c.order_count + count, total_spent=stats.c.total_spent + amount)
+    )
+    result = await db.execute(increment)
+    if result.rowcount:
+        return
+    try:
+        async with db.begin_nested():
+            await db.execute(insert(stats).values(
+                user_id=user_id, order_count=count, first_order_at=first_order_at, total_spent=amount
+            ))
+    except IntegrityError:
+        # 同一用户的另一笔首单已先插入汇总行
+        await db.execute(increment)
+
+
+async def user_order_count(db: AsyncSession, user_id: int) -> int:
+    """
+    用户订单数（主键查询）。
+    """
+    stats = await db.get(UserOrderStats, user_id)
+    return stats.order_count if stats else 0
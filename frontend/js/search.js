@@ -148,6 +148,7 @@ async function handleSearch(page = 1) {
 
     const params = new URLSearchParams();
     params.set('keyword', keyword);
+    params.set('search_mode', 'pinyin'); // 支持全拼、首字母缩写与中英混合输入
     params.set('page', page);
     params.set('page_size', '10');
 
@@ -51,6 +51,7 @@ async def generate_fake_data_async():
         
         # 清空表
         db.execute(text("TRUNCATE TABLE shop_images;"))
+        db.execute(text("TRUNCATE TABLE shop_search_tokens;"))
         db.execute(text("TRUNCATE TABLE shops;"))
         db.execute(text("TRUNCATE TABLE search_history;"))
         db.execute(text("TRUNCATE TABLE packages;"))
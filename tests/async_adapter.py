@@ -0,0 +1,43 @@
+from contextlib import asynccontextmanager
+
+
+class SyncSessionAdapter:
+    """
+    以同步 SQLite 会话模拟 AsyncSession 的常用接口（测试环境没有异步 SQLite 驱动）。
+    """
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if self.sync_session.in_transaction():
+            self.sync_session.rollback()
+        return False
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def get(self, entity, ident):
+        return self.sync_session.get(entity, ident)
+
+    async def execute(self, statement, params=None):
+        return self.sync_session.execute(statement, params)
+
+    async def scalar(self, statement, params=None):
+        return self.sync_session.scalar(statement, params)
+
+    async def flush(self):
+        self.sync_session.flush()
+
+    async def commit(self):
+        self.sync_session.commit()
+
+    async def rollback(self):
+        self.sync_session.rollback()
+
+    @asynccontextmanager
+    async def begin_nested(self):
+        with self.sync_session.begin_nested():
+            yield
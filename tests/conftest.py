@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.main import app
+from backend.models import Base, Shop, Package
+from backend.database import get_db
+from backend.login import get_current_user
+from backend.voucher_codes import voucher_code_generator
+from tests.async_adapter import SyncSessionAdapter
+
+
+@pytest.fixture
+def order_engine(tmp_path, monkeypatch):
+    """
+    下单接口测试共用的数据库：一个店铺、两个套餐，当前用户为 alice（id=1）。
+    TestClient 在其他线程中执行请求，使用文件数据库；券码生成器使用同一数据库领取序号。
+    各测试文件按需在此基础上写入优惠券、用户等数据。
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'orders.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Shop(id=1, name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo"))
+        db.add(Package(id=1, title="双人餐", price=99, contents="锅底*1", sales=0, shop_id=1))
+        db.add(Package(id=2, title="单人餐", price=49, contents="锅底*1", sales=0, shop_id=1))
+        db.commit()
+
+    async def override_get_db():
+        async with SyncSessionAdapter(Session(engine)) as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: {"id": 1, "username": "alice"}
+    monkeypatch.setattr(voucher_code_generator, "_session_factory", lambda: SyncSessionAdapter(Session(engine)))
+    monkeypatch.setattr(voucher_code_generator, "_secret", b"test-voucher-secret")
+    monkeypatch.setattr(voucher_code_generator, "_permutation", None)
+    yield engine
+    app.dependency_overrides.clear()
@@ -0,0 +1,28 @@
+from datetime import datetime
+from backend.business_hours import parse_business_hours, is_open_at
+from backend.models import Shop, _fill_shop_derived_columns
+
+
+def test_parse_business_hours():
+    assert parse_business_hours("10:00-22:00") == (600, 1320)
+    assert parse_business_hours("18:30-02:00") == (1110, 120)
+    assert parse_business_hours("24:00-02:00") is None
+    assert parse_business_hours("全天营业") is None
+    assert parse_business_hours(None) is None
+
+
+def test_is_open_at_overnight():
+    open_minute, close_minute = parse_business_hours("18:00-02:00")
+    assert is_open_at(open_minute, close_minute, 23 * 60)
+    assert is_open_at(open_minute, close_minute, 60)
+    assert not is_open_at(open_minute, close_minute, 12 * 60)
+
+
+def test_shop_write_fills_open_close_minute():
+    shop = Shop(name="夜宵店", business_hours="18:00-02:00")
+    _fill_shop_derived_columns(None, None, shop)
+    assert (shop.open_minute, shop.close_minute) == (1080, 120)
+
+    shop.business_hours = "营业中"
+    _fill_shop_derived_columns(None, None, shop)
+    assert shop.open_minute is None and shop.close_minute is None
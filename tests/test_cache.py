@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.models import Base, Shop, Package
+from backend.catalog_events import register_catalog_observer, unregister_catalog_observer
+from sqlalchemy.util.concurrency import greenlet_spawn
+from backend.cache import CacheBackend, DetailCache, MemoryLRUCache
+
+def run(coro):
+    return asyncio.run(coro)
+
+def constant(value):
+    async def loader():
+        return value
+    return loader
+
+class RemoteCache(CacheBackend):
+    """
+    模拟 Redis：删除需要等待网络往返。
+    """
+    def __init__(self, fail=False):
+        self.deleted = []
+        self.fail = fail
+
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl):
+        pass
+
+    async def delete(self, *keys):
+        await asyncio.sleep(0.01)
+        if self.fail:
+            raise ConnectionError("redis down")
+        self.deleted.extend(keys)
+
+def test_memory_cache_ttl_and_lru():
+    cache = MemoryLRUCache(max_entries=2)
+    run(cache.set("a", 1, ttl=60))
+    run(cache.set("b", 2, ttl=60))
+    assert run(cache.get("a")) == 1
+    run(cache.set("c", 3, ttl=60))
+    assert run(cache.get("b")) is None
+    run(cache.set("d", 4, ttl=-1))
+    assert run(cache.get("d")) is None
+
+def test_read_through_counts_hits_and_misses():
+    cache = DetailCache(MemoryLRUCache())
+    assert run(cache.get_or_load("package", 1, constant({"id": 1}))) == {"id": 1}
+    assert run(cache.get_or_load("package", 1, constant({"id": 2}))) == {"id": 1}
+    # 不存在的行不缓存
+    assert run(cache.get_or_load("package", 9, constant(None))) is None
+    assert cache.stats() == {"package": {"hits": 1, "misses": 2, "hit_rate": 0.3333}}
+
+def test_invalidation_during_load_skips_backfill():
+    cache = DetailCache(MemoryLRUCache())
+
+    async def stale_loader():
+        cache.on_package_changed({"id": 1, "shop_id": 1})
+        return {"id": 1, "sales": 0}
+
+    run(cache.get_or_load("package", 1, stale_loader))
+    assert run(cache.backend.get("package:1")) is None
+
+def test_invalidation_of_other_key_keeps_backfill():
+    cache = DetailCache(MemoryLRUCache())
+
+    async def loader():
+        # 加载期间其他套餐的订单事件不影响本键回填
+        cache.on_package_changed({"id": 2, "shop_id": 1})
+        return {"id": 1, "sales": 0}
+
+    run(cache.get_or_load("package", 1, loader))
+    assert run(cache.backend.get("package:1")) == {"id": 1, "sales": 0}
+    assert not cache._loading and not cache._invalidations
+
+def test_package_write_invalidates_after_commit():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    cache = DetailCache(MemoryLRUCache())
+    register_catalog_observer(cache)
+    try:
+        with Session(engine) as db:
+            shop = Shop(name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo")
+            db.add(shop)
+            db.flush()
+            package = Package(title="双人餐", price=99, contents="锅底*1", sales=0, shop_id=shop.id)
+            db.add(package)
+            db.commit()
+
+            run(cache.get_or_load("package", package.id, constant({"id": package.id, "sales": 0})))
+
+            # 与 PackageSalesObserver 相同的写入方式
+            package.sales += 1
+            db.commit()
+            assert run(cache.backend.get(f"package:{package.id}")) is None
+    finally:
+        unregister_catalog_observer(cache)
+
+def test_remote_invalidate_waits_in_commit_greenlet():
+    backend = RemoteCache()
+
+    async def commit():
+        # AsyncSession 的提交回调运行在 greenlet 中
+        await greenlet_spawn(backend.invalidate, "package:1")
+        return list(backend.deleted)
+
+    assert run(commit()) == ["package:1"]
+
+def test_remote_invalidate_failure_is_logged(capsys):
+    backend = RemoteCache(fail=True)
+    run(greenlet_spawn(backend.invalidate, "package:1"))
+    assert "Failed to invalidate cache keys ['package:1']" in capsys.readouterr().out
@@ -0,0 +1,120 @@
+import datetime
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.main import app
+from backend.models import Base, Shop, ShopImage, Package, CatalogVersion
+from backend.database import get_db
+from backend.cache import detail_cache
+
+client = TestClient(app)
+
+@pytest.fixture
+def mock_db_session():
+    mock_session = AsyncMock(AsyncSession)
+
+    async def mock_get_db():
+        yield mock_session
+
+    detail_cache.backend.clear()
+    app.dependency_overrides[get_db] = mock_get_db
+    yield mock_session
+    app.dependency_overrides.clear()
+    detail_cache.backend.clear()
+
+def create_package(version=1):
+    return Package(
+        id=7, title="双人餐", price=99.0, description=None, contents="锅底*1",
+        sales=10, shop_id=1, version=version,
+        updated_at=datetime.datetime(2026, 10, 1, 8, 30, 0)
+    )
+
+def test_package_detail_returns_304_for_matching_etag(mock_db_session):
+    mock_db_session.get = AsyncMock(return_value=create_package(version=3))
+
+    first = client.get("/api/packages/7")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Last-Modified"] == "Thu, 01 Oct 2026 08:30:00 GMT"
+
+    second = client.get("/api/packages/7", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["ETag"] == etag
+    # 304 由缓存中的版本号直接判断，不查询数据库
+    assert mock_db_session.get.await_count == 1
+
+def test_package_etag_changes_with_version(mock_db_session):
+    mock_db_session.get = AsyncMock(return_value=create_package(version=1))
+    etag = client.get("/api/packages/7").headers["ETag"]
+
+    detail_cache.on_package_changed({"id": 7, "shop_id": 1})
+    mock_db_session.get = AsyncMock(return_value=create_package(version=2))
+    response = client.get("/api/packages/7", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_versions_bump_on_update_and_image_change():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        shop = Shop(name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo")
+        db.add(shop)
+        db.commit()
+        assert shop.version == 1
+
+        # 没有实际变化时不递增
+        shop.rating = shop.rating
+        db.commit()
+        assert shop.version == 1
+
+        shop.rating = 4.6
+        db.commit()
+        assert shop.version == 2
+
+        db.add(ShopImage(shop_id=shop.id, image_url="a.jpg"))
+        db.commit()
+        db.refresh(shop)
+        assert shop.version == 3
+
+def test_version_increment_is_sql_side(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'versions.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Shop(name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo"))
+        db.commit()
+
+    # 两个会话读到同一版本后先后更新，两次递增都生效
+    with Session(engine) as first, Session(engine) as second:
+        a, b = first.get(Shop, 1), second.get(Shop, 1)
+        a.rating = 4.1
+        first.commit()
+        b.avg_cost = 88
+        second.commit()
+        assert b.version == 3
+
+def test_catalog_version_tracks_shop_and_image_writes():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    catalog_version = lambda: db.scalar(select(CatalogVersion.version).where(CatalogVersion.name == "shops"))
+    with Session(engine) as db:
+        shop = Shop(name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo")
+        db.add(shop)
+        db.commit()
+        assert catalog_version() == 1
+
+        shop.rating = shop.rating
+        db.commit()
+        assert catalog_version() == 1
+
+        shop.rating = 4.6
+        db.commit()
+        assert catalog_version() == 2
+
+        db.add(ShopImage(shop_id=shop.id, image_url="a.jpg"))
+        db.commit()
+        assert catalog_version() == 3
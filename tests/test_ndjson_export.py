@@ -0,0 +1,81 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.models import Shop
+import backend.filter_sort as filter_sort
+
+client = TestClient(app)
+
+def create_shop(id, rating, avg_cost):
+    return Shop(
+        id=id,
+        name=f"店铺{id}",
+        category="火锅",
+        rating=rating,
+        price_range="$$",
+        avg_cost=avg_cost,
+        name_pinyin="dianpu",
+        category_pinyin="huoguo",
+        address="北京市朝阳区",
+        phone="1234567890",
+        business_hours="10:00-22:00",
+        image_url=None
+    )
+
+class FakeStreamResult:
+    def __init__(self, partitions):
+        self._partitions = partitions
+
+    async def partitions(self):
+        for part in self._partitions:
+            yield part
+
+class FakeSession:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.queries = []
+        self.expunged = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def stream_scalars(self, query):
+        self.queries.append(query)
+        return FakeStreamResult(self.partitions)
+
+    def expunge_all(self):
+        self.expunged += 1
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    session = FakeSession([
+        [create_shop(1, 4.5, 80.0), create_shop(2, 4.0, 60.0)],
+        [create_shop(3, 3.5, 40.0)],
+    ])
+    monkeypatch.setattr(filter_sort, "async_session", lambda: session)
+    return session
+
+def test_filter_ndjson_streams_one_shop_per_line(fake_session):
+    response = client.get("/api/filter", params={"rating": 3.0, "format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3]
+    # 每批写出后释放会话中的对象
+    assert fake_session.expunged == 2
+    assert "yield_per" in fake_session.queries[0].get_execution_options()
+
+def test_sort_ndjson_uses_sql_ordering(fake_session):
+    response = client.get("/api/sort", params={"sort_by": "rating", "format": "ndjson", "limit": 3})
+    assert response.status_code == 200
+    sql = str(fake_session.queries[0])
+    assert "ORDER BY shops.rating DESC, shops.id ASC" in sql
+    assert "LIMIT" in sql
+
+def test_invalid_format_rejected():
+    response = client.get("/api/filter", params={"format": "csv"})
+    assert response.status_code == 422
@@ -0,0 +1,70 @@
+import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, event
+from sqlalchemy.orm import Session
+from backend.main import app
+from backend.models import Order, Coupon, UserCoupon, CouponStatus, DiscountType, OrderOutboxEvent
+from backend.order_observers import PackageSalesObserver, CouponUsageObserver
+
+client = TestClient(app)
+
+@pytest.fixture
+def engine(order_engine):
+    with Session(order_engine) as db:
+        db.add(Coupon(id=1, name="满50减10", discount_type=DiscountType.deduction, discount_value=10, min_spend=50))
+        db.add(UserCoupon(id=1, user_id=1, coupon_id=1, status=CouponStatus.unused))
+        db.add(UserCoupon(id=2, user_id=1, coupon_id=1, status=CouponStatus.unused,
+                          expires_at=datetime.datetime(2020, 1, 1)))
+        db.commit()
+    return order_engine
+
+def test_batch_checkout_reports_each_line(engine):
+    response = client.post("/api/orders/batch", json={"items": [
+        {"package_id": 1, "coupon_id": 1},
+        {"package_id": 1, "coupon_id": 1},
+        {"package_id": 99},
+        {"package_id": 1, "coupon_id": 2},
+        {"package_id": 2},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["order"]["order_amount"] == 89
+    assert results[1] == {"index": 1, "order": None, "detail": "该优惠券不可用或已使用"}
+    assert results[2]["detail"] == "未找到指定套餐"
+    assert results[3]["detail"] == "该优惠券已过期"
+    assert results[4]["order"]["order_amount"] == 49
+
+    with Session(engine) as db:
+        orders = db.scalars(select(Order).order_by(Order.id)).all()
+        assert [(o.id, o.package_id, o.coupon_id) for o in orders] == [
+            (results[0]["order"]["id"], 1, 1),
+            (results[4]["order"]["id"], 2, None),
+        ]
+        assert orders[0].voucher_code != orders[1].voucher_code
+        # 过期的券与订单一起提交
+        assert db.get(UserCoupon, 2).status == CouponStatus.expired
+
+def test_batch_checkout_validates_item_count(engine):
+    assert client.post("/api/orders/batch", json={"items": []}).status_code == 422
+    assert client.post("/api/orders/batch", json={"items": [{"package_id": 1}] * 51}).status_code == 422
+
+def test_batch_checkout_writes_outbox_and_coupons_in_bulk(engine, monkeypatch):
+    monkeypatch.setattr("backend.order_observers._observers", [PackageSalesObserver(), CouponUsageObserver()])
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = client.post("/api/orders/batch", json={"items": [
+        {"package_id": 1, "coupon_id": 1}, {"package_id": 2}, {"package_id": 1}
+    ]})
+    assert response.status_code == 200
+
+    # 订单与发件箱事件各一条批量 INSERT，用户券只在加载时查询一次
+    assert sum(s.startswith("INSERT INTO order_outbox") for s in statements) == 1
+    assert sum(s.startswith("INSERT INTO orders") for s in statements) == 1
+    assert sum(s.startswith("SELECT") and "FROM user_coupons" in s for s in statements) == 1
+    with Session(engine) as db:
+        assert len(db.scalars(select(OrderOutboxEvent)).all()) == 3
+        assert db.get(UserCoupon, 1).status == CouponStatus.used
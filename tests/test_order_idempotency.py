@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from backend.main import app
+from backend.models import Package, Order, OrderIdempotencyKey
+
+client = TestClient(app)
+
+def count_orders(engine):
+    with Session(engine) as db:
+        return db.scalar(select(func.count(Order.id)))
+
+def test_retry_with_same_key_returns_original_order(order_engine):
+    headers = {"Idempotency-Key": "retry-1"}
+    first = client.post("/api/orders", json={"package_id": 1}, headers=headers)
+    assert first.status_code == 200
+
+    # 重试时即使套餐价格已变化也直接返回首次结果，说明没有重新计价
+    with Session(order_engine) as db:
+        db.get(Package, 1).price = 1
+        db.commit()
+    second = client.post("/api/orders", json={"package_id": 1}, headers=headers)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert count_orders(order_engine) == 1
+
+    # 不带幂等键或使用新键时正常下单
+    assert client.post("/api/orders", json={"package_id": 1}).status_code == 200
+    assert client.post("/api/orders", json={"package_id": 1}, headers={"Idempotency-Key": "retry-2"}).status_code == 200
+    assert count_orders(order_engine) == 3
+
+def test_same_key_with_different_body_is_rejected(order_engine):
+    headers = {"Idempotency-Key": "retry-1"}
+    assert client.post("/api/orders", json={"package_id": 1}, headers=headers).status_code == 200
+    response = client.post("/api/orders", json={"package_id": 2}, headers=headers)
+    assert response.status_code == 422
+    assert count_orders(order_engine) == 1
+
+def test_concurrent_duplicate_rolls_back_and_replays(order_engine, monkeypatch):
+    first = client.post("/api/orders", json={"package_id": 1}, headers={"Idempotency-Key": "retry-1"})
+
+    # 模拟并发：重试请求查找幂等键时首次请求尚未提交
+    import backend.orders
+    replay = backend.orders.replay_idempotent_order
+    calls = []
+
+    async def racing_replay(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else await replay(*args)
+
+    monkeypatch.setattr(backend.orders, "replay_idempotent_order", racing_replay)
+    second = client.post("/api/orders", json={"package_id": 1}, headers={"Idempotency-Key": "retry-1"})
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert len(calls) == 2
+    assert count_orders(order_engine) == 1
+    with Session(order_engine) as db:
+        assert db.scalar(select(func.count(OrderIdempotencyKey.id))) == 1
@@ -0,0 +1,69 @@
+import asyncio
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from backend.models import Base, Shop, Package, Order, UserCoupon, CouponStatus, OrderOutboxEvent
+from backend.catalog_events import CatalogObserver, register_catalog_observer, unregister_catalog_observer
+from tests.async_adapter import SyncSessionAdapter
+from backend.order_observers import OrderObserver, PackageSalesObserver, CouponUsageObserver, notify_order_created
+
+class RecordingObserver(CatalogObserver):
+    def __init__(self):
+        self.packages = []
+
+    def on_package_changed(self, package):
+        self.packages.append(package)
+
+def test_sales_increment_is_atomic_and_notifies_catalog():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    observer = RecordingObserver()
+    register_catalog_observer(observer)
+    try:
+        with Session(engine) as db:
+            db.add(Shop(id=1, name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo"))
+            db.add(Package(id=1, title="双人餐", price=99, contents="锅底*1", sales=5, shop_id=1))
+            db.commit()
+            observer.packages.clear()
+
+            order = Order(id=1, user_id=1, package_id=1, voucher_code="1", order_amount=99)
+            for _ in range(3):
+                asyncio.run(PackageSalesObserver().on_order_created(order, SyncSessionAdapter(db)))
+                # 观察者不自行提交，由下单事务统一提交
+                assert db.in_transaction()
+                db.commit()
+
+            sales, version = db.execute(select(Package.sales, Package.version)).one()
+            assert (sales, version) == (8, 4)
+            assert [p["sales"] for p in observer.packages] == [6, 7, 8]
+            assert observer.packages[-1]["shop_id"] == 1
+    finally:
+        unregister_catalog_observer(observer)
+
+class FailingObserver(OrderObserver):
+    inline = True
+
+    async def on_order_created(self, order, db):
+        db.sync_session.add(Shop(id=2, name="半途而废", category="火锅", name_pinyin="", category_pinyin=""))
+        db.sync_session.flush()
+        raise RuntimeError("boom")
+
+def test_failing_observer_rolls_back_only_its_savepoint(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr("backend.order_observers._observers", [FailingObserver(), CouponUsageObserver(), PackageSalesObserver()])
+    with Session(engine) as db:
+        db.add(Shop(id=1, name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo"))
+        db.add(Package(id=1, title="双人餐", price=99, contents="锅底*1", sales=0, shop_id=1))
+        db.add(UserCoupon(id=1, user_id=1, coupon_id=3, status=CouponStatus.unused))
+        db.add(Order(id=1, user_id=1, package_id=1, voucher_code="1", order_amount=99, coupon_id=3))
+        db.flush()
+
+        order = db.get(Order, 1)
+        asyncio.run(notify_order_created(order, SyncSessionAdapter(db)))
+        db.commit()
+
+        assert db.get(Shop, 2) is None
+        # 同步观察者在下单事务中执行，销量更新只写入发件箱事件
+        assert db.get(UserCoupon, 1).status == CouponStatus.used
+        assert db.scalar(select(Package.sales)) == 0
+        assert db.scalars(select(OrderOutboxEvent.order_id)).all() == [1]
@@ -0,0 +1,108 @@
+import asyncio
+import datetime
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from backend.models import Base, Order, OrderOutboxEvent, OrderEventDelivery
+from backend.order_observers import OrderObserver
+from backend.order_outbox import OrderOutboxWorker
+from tests.async_adapter import SyncSessionAdapter
+
+class CountingObserver(OrderObserver):
+    def __init__(self, failures=0):
+        self.calls = 0
+        self.failures = failures
+
+    async def on_order_created(self, order, db):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("temporarily unavailable")
+
+class FlakyObserver(CountingObserver):
+    pass
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Order(id=1, user_id=1, package_id=1, voucher_code="1", order_amount=99))
+        db.add(OrderOutboxEvent(id=1, order_id=1))
+        db.commit()
+    return engine
+
+def make_worker(engine, **kwargs):
+    return OrderOutboxWorker(session_factory=lambda: SyncSessionAdapter(Session(engine)), **kwargs)
+
+def load_event(engine):
+    with Session(engine) as db:
+        return db.get(OrderOutboxEvent, 1)
+
+def test_failed_delivery_is_retried_without_repeating_successful_observers(engine, monkeypatch):
+    stable, flaky = CountingObserver(), FlakyObserver(failures=1)
+    monkeypatch.setattr("backend.order_observers._observers", [stable, flaky])
+    worker = make_worker(engine, retry_base_delay=0)
+
+    asyncio.run(worker.process(1))
+    event = load_event(engine)
+    assert (event.status, event.attempts) == ("pending", 1)
+    assert "FlakyObserver" in event.last_error
+
+    asyncio.run(worker.process(1))
+    event = load_event(engine)
+    assert event.status == "done"
+    # 已投递的观察者重试时跳过（幂等）
+    assert (stable.calls, flaky.calls) == (1, 2)
+    with Session(engine) as db:
+        assert sorted(db.scalars(select(OrderEventDelivery.observer)).all()) == ["CountingObserver", "FlakyObserver"]
+
+def test_event_marked_failed_after_max_attempts(engine, monkeypatch):
+    monkeypatch.setattr("backend.order_observers._observers", [FlakyObserver(failures=10)])
+    worker = make_worker(engine, max_attempts=2, retry_base_delay=0)
+    asyncio.run(worker.process(1))
+    asyncio.run(worker.process(1))
+    assert load_event(engine).status == "failed"
+
+def test_claim_respects_limit_and_leases_events(engine):
+    with Session(engine) as db:
+        db.add_all([OrderOutboxEvent(id=i, order_id=1) for i in (2, 3)])
+        db.commit()
+    worker = make_worker(engine, lease_seconds=60)
+
+    assert asyncio.run(worker.claim(2)) == [1, 2]
+    # 已领取的事件在租约内不会被再次领取
+    assert asyncio.run(worker.claim(5)) == [3]
+    assert asyncio.run(worker.claim(5)) == []
+    assert load_event(engine).available_at > datetime.datetime.utcnow()
+
+class SlowObserver(OrderObserver):
+    timeout = 0.05
+
+    async def on_order_created(self, order, db):
+        await asyncio.sleep(1)
+
+def test_parallel_dispatch_times_out_slow_observer(tmp_path, monkeypatch):
+    from backend.order_observers.metrics import observer_metrics
+    observer_metrics.clear()
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Order(id=1, user_id=1, package_id=1, voucher_code="1", order_amount=99))
+        db.add(OrderOutboxEvent(id=1, order_id=1))
+        db.commit()
+    fast = CountingObserver()
+    monkeypatch.setattr("backend.order_observers._observers", [SlowObserver(), fast])
+    worker = make_worker(engine, observer_timeout=5)
+
+    asyncio.run(worker.process(1))
+
+    event = load_event(engine)
+    assert event.status == "pending"
+    assert "SlowObserver: timed out" in event.last_error
+    assert fast.calls == 1
+    metrics = observer_metrics.snapshot()
+    assert metrics["SlowObserver"]["outcomes"] == {"timeout": 1}
+    assert metrics["SlowObserver"]["max"] < 1
+    assert metrics["CountingObserver"]["outcomes"] == {"ok": 1}
+    assert metrics["CountingObserver"]["buckets"]["+Inf"] == 1
+    observer_metrics.clear()
@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.main import app
+from backend.models import Base, Shop, Package
+from backend.database import get_db
+from backend.cache import detail_cache
+from backend.shops import top_packages_statement
+from tests.async_adapter import SyncSessionAdapter
+
+client = TestClient(app)
+
+def create_package(id, sales, shop_id=1):
+    return Package(
+        id=id, title=f"套餐{id}", price=50.0, description=None, contents="饮料*1",
+        sales=sales, shop_id=shop_id, version=1, updated_at=None
+    )
+
+@pytest.fixture
+def mock_db_session():
+    mock_session = AsyncMock(AsyncSession)
+
+    async def mock_get_db():
+        yield mock_session
+
+    detail_cache.backend.clear()
+    app.dependency_overrides[get_db] = mock_get_db
+    yield mock_session
+    app.dependency_overrides.clear()
+    detail_cache.backend.clear()
+
+def mock_packages(mock_db_session, packages):
+    mock_result = MagicMock()
+    mock_result.scalars.return_value.all.return_value = packages
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+
+def test_shop_packages_paginated_by_sales(mock_db_session):
+    mock_db_session.scalar = AsyncMock(return_value=3)
+    mock_packages(mock_db_session, [create_package(2, 90), create_package(1, 50)])
+    first = client.get("/api/shops/1/packages?page_size=2")
+    mock_packages(mock_db_session, [create_package(3, 10)])
+    second = client.get("/api/shops/1/packages?page=2&page_size=2")
+
+    assert [p["id"] for p in first.json()] == [2, 1]
+    assert [p["id"] for p in second.json()] == [3]
+    assert first.headers["X-Total-Count"] == second.headers["X-Total-Count"] == "3"
+    # 排序与分页在 SQL 中完成，每页只读取 page_size 行
+    query = mock_db_session.execute.await_args.args[0]
+    sql = str(query)
+    assert "ORDER BY packages.sales DESC, packages.id ASC" in sql
+    assert "LIMIT" in sql and "OFFSET" in sql
+    assert query.compile().params["param_1"] == 2
+
+def test_shop_packages_pages_in_sql_semantics(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'packages.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Shop(id=1, name="甲", category="火锅", name_pinyin="jia", category_pinyin="huo guo"))
+        db.flush()
+        for id, sales in ((1, 50), (2, 90), (3, 10), (4, 50)):
+            db.add(Package(id=id, title="t", price=1, contents="c", sales=sales, shop_id=1))
+        db.commit()
+
+    async def sqlite_db():
+        with Session(engine) as session:
+            yield SyncSessionAdapter(session)
+
+    app.dependency_overrides[get_db] = sqlite_db
+    try:
+        first = client.get("/api/shops/1/packages?page_size=3")
+        second = client.get("/api/shops/1/packages?page=2&page_size=3")
+        missing = client.get("/api/shops/2/packages")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [p["id"] for p in first.json()] == [2, 1, 4]
+    assert [p["id"] for p in second.json()] == [3]
+    assert first.headers["X-Total-Count"] == "4"
+    assert first.headers["ETag"] != second.headers["ETag"]
+    assert missing.status_code == 404
+
+def test_packages_by_shops_returns_top_per_shop(mock_db_session):
+    mock_packages(mock_db_session, [create_package(1, 90, shop_id=1), create_package(5, 70, shop_id=2)])
+
+    response = client.get("/api/packages/by-shops?shop_ids=1&shop_ids=2&shop_ids=3")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [p["id"] for p in body["1"]] == [1]
+    assert [p["id"] for p in body["2"]] == [5]
+    assert body["3"] == []
+    assert mock_db_session.execute.await_count == 1
+
+def test_top_packages_window_query_semantics():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for shop_id, name in ((1, "甲"), (2, "乙")):
+            db.add(Shop(id=shop_id, name=name, category="火锅", name_pinyin=name, category_pinyin="huo guo"))
+        db.flush()
+        for id, sales, shop_id in ((1, 5, 1), (2, 9, 1), (3, 9, 1), (4, 1, 2)):
+            db.add(Package(id=id, title="t", price=1, contents="c", sales=sales, shop_id=shop_id))
+        db.commit()
+
+        rows = db.scalars(top_packages_statement([1, 2], per_shop=2)).all()
+        assert [(p.shop_id, p.id) for p in rows] == [(1, 2), (1, 3), (2, 4)]
@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from backend.models import Base, Shop
+from backend.pagination import encode_cursor, decode_cursor, keyset_after, keyset_order_by
+
+def test_cursor_round_trip_with_datetime():
+    values = [datetime(2025, 6, 1, 12, 30, 5), 42]
+    assert decode_cursor(encode_cursor(values), 2) == values
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1]), encode_cursor([[1], 2])])
+def test_invalid_cursor_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, 2)
+    assert exc.value.status_code == 400
+
+def collect_keyset_pages(db, keyset, columns, size=5):
+    base = select(*columns).order_by(*keyset_order_by(keyset))
+    pages, last_id = [], None
+    while True:
+        query = base if last_id is None else base.where(keyset_after(keyset, last_id))
+        rows = db.execute(query.limit(size)).all()
+        if not rows:
+            break
+        pages.extend(rows)
+        last_id = decode_cursor(encode_cursor([rows[-1].id]), 1)[0]
+    return pages, db.execute(base).all()
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_keyset_pages_cover_offset_order(direction):
+    # 评分大量重复，验证主键兜底后逐页翻完与一次性排序结果一致
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for i in range(23):
+            # 4.3 无法用二进制浮点精确表示，游标只携带主键，不会因精度丢失跳过或重复并列的行
+            db.add(Shop(name=f"店铺{i}", category="火锅", rating=[4.0, 4.3, 5.0][i % 3]))
+        db.commit()
+
+        keyset = [(Shop.rating, direction), (Shop.id, direction)]
+        pages, expected = collect_keyset_pages(db, keyset, [Shop.rating, Shop.id])
+        assert pages == expected
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_keyset_pages_with_null_sort_values(direction):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for i in range(17):
+            db.add(Shop(name=f"店铺{i}", category="火锅", avg_cost=None if i % 3 == 0 else [58.5, 120.0][i % 2]))
+        db.commit()
+
+        keyset = [(Shop.avg_cost, direction), (Shop.id, "desc")]
+        pages, expected = collect_keyset_pages(db, keyset, [Shop.avg_cost, Shop.id], size=4)
+        assert pages == expected
+        # NULL 视为最小值：升序排在最前，降序排在最后
+        nulls = [row.id for row in pages if row.avg_cost is None]
+        assert len(nulls) == 6
+        assert (pages[0].avg_cost is None) == (direction == "asc")
+
+def test_keyset_after_deleted_cursor_row_returns_empty_page():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([Shop(id=i, name=f"店铺{i}", category="火锅", rating=4.0) for i in (1, 2, 3)])
+        db.commit()
+        keyset = [(Shop.rating, "desc"), (Shop.id, "desc")]
+        assert db.scalars(select(Shop.id).where(keyset_after(keyset, 99))).all() == []
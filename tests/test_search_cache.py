@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from backend.search_cache import SearchResponseCache
+
+def test_concurrent_identical_searches_compute_once():
+    cache = SearchResponseCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return 'W/"etag"', b"{}"
+
+    async def burst():
+        return await asyncio.gather(*(cache.get_or_compute(("火锅",), compute) for _ in range(20)))
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(result == ('W/"etag"', b"{}") for result in results)
+    assert (cache.hits, cache.misses) == (19, 1)
+
+def test_errors_are_shared_and_not_cached():
+    cache = SearchResponseCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def burst():
+        return await asyncio.gather(*(cache.get_or_compute("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache._entries == {}
+
+def test_generation_bump_during_compute_skips_store():
+    cache = SearchResponseCache()
+
+    async def compute():
+        cache.on_shop_changed({"id": 1})
+        return 'W/"old"', b"[]"
+
+    asyncio.run(cache.get_or_compute("k", compute))
+    assert cache._entries == {}
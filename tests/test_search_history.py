@@ -0,0 +1,88 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.search_history import SearchHistoryBuffer
+
+def make_session_factory(existing_rows):
+    session = AsyncMock(AsyncSession)
+    select_result = MagicMock()
+    select_result.all.return_value = existing_rows
+    session.execute = AsyncMock(return_value=select_result)
+
+    class Factory:
+        async def __aenter__(self):
+            return session
+
+        async def __aexit__(self, *exc):
+            return False
+
+    return (lambda: Factory()), session
+
+@pytest.mark.asyncio
+async def test_flush_coalesces_keywords_into_one_batch():
+    factory, session = make_session_factory([(7, "火锅")])
+    buffer = SearchHistoryBuffer(session_factory=factory)
+    for keyword in ("火锅", "奶茶", "火锅", "火锅"):
+        buffer.record(keyword)
+    assert len(buffer.pending()) == 2
+
+    await buffer.flush()
+
+    # 一次 SELECT + 一次批量 UPDATE + 一次批量 INSERT，一次提交
+    assert session.execute.await_count == 3
+    updates = session.execute.await_args_list[1].args[1]
+    inserts = session.execute.await_args_list[2].args[1]
+    assert [row["id"] for row in updates] == [7]
+    assert [row["keyword"] for row in inserts] == ["奶茶"]
+    session.commit.assert_awaited_once()
+    assert buffer.pending() == []
+
+@pytest.mark.asyncio
+async def test_flush_failure_keeps_records_for_retry():
+    factory, session = make_session_factory([])
+    session.commit.side_effect = RuntimeError("db down")
+    buffer = SearchHistoryBuffer(session_factory=factory)
+    buffer.record("火锅")
+
+    await buffer.flush()
+
+    assert [keyword for keyword, _ in buffer.pending()] == ["火锅"]
+
+@pytest.mark.asyncio
+async def test_flush_matches_rows_by_collation():
+    # 不区分大小写的排序规则下，IN ('kfc ') 返回已有行 "Kfc"
+    factory, session = make_session_factory([(3, "Kfc")])
+    buffer = SearchHistoryBuffer(session_factory=factory)
+    buffer.record("kfc ")
+    buffer.record("火锅")
+    buffer.record("x" * 150)
+
+    await buffer.flush()
+
+    updates = session.execute.await_args_list[1].args[1]
+    inserts = session.execute.await_args_list[2].args[1]
+    assert [row["id"] for row in updates] == [3]
+    assert [row["keyword"] for row in inserts] == ["火锅", "x" * 100]
+    session.commit.assert_awaited_once()
+    assert buffer.pending() == []
+
+@pytest.mark.asyncio
+async def test_bad_keyword_does_not_block_batch():
+    factory, session = make_session_factory([])
+    select_result = session.execute.return_value
+
+    async def execute(statement, params=None):
+        if params and any(row["keyword"] == "坏" for row in params):
+            raise RuntimeError("Data too long")
+        return select_result
+
+    session.execute = AsyncMock(side_effect=execute)
+    buffer = SearchHistoryBuffer(session_factory=factory)
+    buffer.record("火锅")
+    buffer.record("坏")
+
+    await buffer.flush()
+
+    # 整批失败后逐条重试：火锅写入，坏数据丢弃，不再放回缓冲
+    assert session.commit.await_count == 1
+    assert buffer.pending() == []
@@ -0,0 +1,105 @@
+import pytest
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import Session
+from pypinyin import pinyin, Style
+from backend.models import Base, Shop, ShopSearchToken
+from backend.search_index import like_keyword_clause, apply_keyword_search, keyword_candidates, keyword_token_sets
+from backend.tokenizer import pinyin_initials
+
+SHOPS = [
+    ("火锅大师", "火锅"),
+    ("小龙坎老火锅", "火锅"),
+    ("奶茶小屋", "奶茶"),
+    ("KFC南区店", "快餐"),
+    ("海底捞 火锅（五角场店）", "火锅"),
+    ("Sushi Bar", "日料"),
+]
+
+def to_pinyin(text):
+    return ' '.join(item[0] for item in pinyin(text, style=Style.NORMAL))
+
+@pytest.fixture
+def session():
+    # 使用内存 SQLite 验证索引维护与查询语义
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        for name, category in SHOPS:
+            db.add(Shop(name=name, category=category,
+                        name_pinyin=to_pinyin(name), category_pinyin=to_pinyin(category)))
+        db.commit()
+        yield db
+
+def search_ids(db, clause):
+    return set(db.scalars(select(Shop.id).where(clause)).all())
+
+def indexed_ids(db, keyword, keyword_pinyin, search_mode="index"):
+    return set(db.scalars(apply_keyword_search(select(Shop.id), keyword, keyword_pinyin, search_mode)).all())
+
+@pytest.mark.parametrize("keyword", [
+    "火锅", "火", "锅大", "奶茶小屋", "kfc", "南区", "huo guo", "huo", "o g",
+    "sushi", "shi b", "五角场", "咖啡", "a_c", "快餐",
+])
+def test_indexed_search_matches_like(session, keyword):
+    keyword_pinyin = to_pinyin(keyword)
+    expected = search_ids(session, like_keyword_clause(keyword, keyword_pinyin))
+    actual = indexed_ids(session, keyword, keyword_pinyin)
+    assert actual == expected
+
+def test_index_maintained_on_update_and_delete(session):
+    shop = session.scalars(select(Shop).where(Shop.name == "奶茶小屋")).one()
+    shop.name = "咖啡小屋"
+    shop.name_pinyin = to_pinyin(shop.name)
+    session.commit()
+
+    assert indexed_ids(session, "咖啡", "ka fei") == {shop.id}
+    assert indexed_ids(session, "奶茶小屋", "nai cha xiao wu") == set()
+
+    session.delete(shop)
+    session.commit()
+    tokens = session.scalars(select(ShopSearchToken).where(ShopSearchToken.shop_id == shop.id)).all()
+    assert tokens == []
+
+def test_pinyin_initials_keeps_latin_runs():
+    assert pinyin_initials("KFC南区店") == "kfcnqd"
+    assert pinyin_initials("火锅大师") == "hgds"
+
+@pytest.mark.parametrize("keyword, expected_names", [
+    ("hg", {"火锅大师", "小龙坎老火锅", "海底捞 火锅（五角场店）"}),
+    ("huoguo", {"火锅大师", "小龙坎老火锅", "海底捞 火锅（五角场店）"}),
+    ("hgds", {"火锅大师"}),
+    ("KFC南区", {"KFC南区店"}),
+    ("kfcnq", {"KFC南区店"}),
+    ("nc", {"奶茶小屋"}),
+    ("xyz", set()),
+])
+def test_pinyin_mode_matches_initials_and_full_pinyin(session, keyword, expected_names):
+    query = apply_keyword_search(select(Shop.name), keyword, to_pinyin(keyword), "pinyin")
+    names = set(session.scalars(query).all())
+    assert names == expected_names
+
+def test_pinyin_mode_is_superset_of_index_mode(session):
+    for keyword in ("火锅", "kfc", "五角场", "sushi"):
+        keyword_pinyin = to_pinyin(keyword)
+        assert indexed_ids(session, keyword, keyword_pinyin) <= \
+            indexed_ids(session, keyword, keyword_pinyin, "pinyin")
+
+def test_index_mode_joins_candidate_table(session):
+    query = apply_keyword_search(select(Shop.id), "火锅", to_pinyin("火锅"))
+    sql = str(query.compile())
+    # shops 与候选 ID 派生表连接，而不是 "shops.id IN (子查询)"
+    assert "JOIN" in sql and "keyword_candidates" in sql
+    assert "shops.id IN" not in sql
+    # 连接派生表后的 count 与结果行数一致（UNION 去重，不产生重复行）
+    count = session.scalar(query.with_only_columns(func.count()).order_by(None))
+    assert count == len(session.scalars(query).all()) == 3
+
+@pytest.mark.parametrize("keyword", ["cafe", "CAFÉ", "ｃａｆｅ", "mono", "Mōno"])
+def test_index_candidates_fold_accents_and_width(session, keyword):
+    # MySQL *_ai_ci 排序规则下 LIKE '%cafe%' 命中 "Café"，候选集必须包含该店铺（SQLite 的 LIKE 不折叠重音，只校验候选集）
+    shop = Shop(name="Café Ｍｏｎｏ", category="咖啡", name_pinyin="Café Ｍｏｎｏ", category_pinyin="ka fei")
+    session.add(shop)
+    session.commit()
+
+    candidates = keyword_candidates(keyword_token_sets(keyword, keyword))
+    assert shop.id in set(session.scalars(select(candidates.c.shop_id)).all())
@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.main import app
+from backend.models import Base, Shop
+from backend.database import get_db
+from backend.shop_catalog import ColumnarShopCatalog, shop_catalog
+import backend.filter_sort as filter_sort
+from tests.async_adapter import SyncSessionAdapter
+
+client = TestClient(app)
+
+ROWS = [
+    (1, 4.5, 75.0),
+    (2, 4.0, 20.0),
+    (3, 4.5, 120.0),
+    (4, None, 35.0),
+    (5, 4.8, None),
+]
+
+@pytest.fixture
+def catalog():
+    catalog = ColumnarShopCatalog()
+    catalog.load(ROWS)
+    return catalog
+
+def test_filter_by_rating_and_cost_range(catalog):
+    assert catalog.filter_ids(rating=4.5) == [1, 3, 5]
+    assert catalog.filter_ids(cost_min=30, cost_max=100) == [1, 4]
+    assert catalog.filter_ids(rating=4.0, cost_max=80) == [1, 2]
+    assert catalog.filter_ids(offset=1, limit=2) == [2, 3]
+
+def test_filter_compares_single_precision_like_mysql():
+    # MySQL FLOAT 中的 4.1 实际为 4.0999999，"rating >= 4.1" 不成立
+    catalog = ColumnarShopCatalog()
+    catalog.load([(1, 4.1, 4.1), (2, 4.2, 50.0)])
+    assert catalog.filter_ids(rating=4.1) == [2]
+    assert catalog.filter_ids(cost_min=4.1) == [2]
+    assert catalog.filter_ids(cost_max=4.1) == [1]
+
+def test_sorted_orderings_match_sql_semantics(catalog):
+    # 评分降序（同分按 id 升序，NULL 最后）
+    assert catalog.sorted_ids("rating") == [5, 1, 3, 2, 4]
+    # 人均升序（NULL 最前）
+    assert catalog.sorted_ids("avg_spend") == [5, 2, 4, 1, 3]
+    assert catalog.sorted_ids("default", offset=1, limit=2) == [4, 3]
+
+def test_shop_change_marks_snapshot_stale(catalog):
+    catalog._stale = False
+    catalog.on_shop_changed({"id": 1})
+    assert catalog._stale
+
+@pytest.fixture
+def shops_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'shops.db'}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        # 接口返回的字段不可为空，使用不含 NULL 的数据
+        for shop_id, rating, avg_cost in [(1, 4.5, 75.0), (2, 4.0, 20.0), (3, 4.5, 120.0), (4, 3.5, 35.0), (5, 4.8, 10.0)]:
+            db.add(Shop(id=shop_id, name=f"店铺{shop_id}", category="火锅", rating=rating, avg_cost=avg_cost,
+                        price_range="$$", name_pinyin="dian pu", category_pinyin="huo guo", address="北京市朝阳区",
+                        phone="1234567890", business_hours="10:00-22:00"))
+        db.commit()
+
+    async def override_get_db():
+        async with SyncSessionAdapter(Session(engine)) as db:
+            yield db
+
+    shop_catalog.mark_stale()
+    app.dependency_overrides[get_db] = override_get_db
+    yield
+    app.dependency_overrides.clear()
+    shop_catalog.mark_stale()
+
+def test_unlimited_requests_read_in_sql_order(shops_db, monkeypatch):
+    # 分页请求由快照给出一页 ID 后回表
+    assert [s["id"] for s in client.get("/api/sort", params={"sort_by": "rating", "limit": 3}).json()] == [5, 1, 3]
+    assert [s["id"] for s in client.get("/api/filter", params={"rating": 4.5, "limit": 2}).json()] == [1, 3]
+
+    # 未指定 limit 时直接按 SQL 顺序读取，不按 ID 列表回表，顺序与快照一致
+    def fail(*args):
+        raise AssertionError("unlimited request must not load by id list")
+    monkeypatch.setattr(filter_sort, "load_shops_in_order", fail)
+    assert [s["id"] for s in client.get("/api/sort", params={"sort_by": "rating"}).json()] == [5, 1, 3, 2, 4]
+    assert [s["id"] for s in client.get("/api/sort", params={"sort_by": "avg_spend"}).json()] == [5, 2, 4, 1, 3]
+    assert [s["id"] for s in client.get("/api/filter", params={"avg_spend_min": 30, "avg_spend_max": 100}).json()] == [1, 4]
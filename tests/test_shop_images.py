@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.models import Base, Shop, ShopImage
+from backend.catalog_events import register_catalog_observer, unregister_catalog_observer
+from backend.shop_images import ShopImageCache, shop_detail_statement
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        shop = Shop(name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo")
+        empty = Shop(name="奶茶小屋", category="奶茶", name_pinyin="nai cha xiao wu", category_pinyin="nai cha")
+        db.add_all([shop, empty])
+        db.flush()
+        db.add_all([ShopImage(shop_id=shop.id, image_url=f"img{i}.jpg") for i in range(5)])
+        db.commit()
+        yield db
+
+def fetch(db, shop_id, page, size):
+    rows = db.execute(shop_detail_statement(shop_id, page, size)).all()
+    if not rows:
+        return None
+    return rows[0][0].name, rows[0].total_images, [r.image_url for r in rows if r.image_id is not None]
+
+def test_shop_count_and_page_in_one_statement(session):
+    assert fetch(session, 1, 1, 2) == ("火锅大师", 5, ["img0.jpg", "img1.jpg"])
+    assert fetch(session, 1, 3, 2) == ("火锅大师", 5, ["img4.jpg"])
+    # 页码越界时仍返回店铺与总数
+    assert fetch(session, 1, 4, 2) == ("火锅大师", 5, [])
+    assert fetch(session, 2, 1, 2) == ("奶茶小屋", 0, [])
+    assert fetch(session, 99, 1, 2) is None
+
+def test_image_writes_invalidate_cache_after_commit(session):
+    cache = ShopImageCache()
+    cache.set(1, 1, 2, (5, []))
+    register_catalog_observer(cache)
+    try:
+        session.add(ShopImage(shop_id=1, image_url="new.jpg"))
+        session.flush()
+        assert cache.get(1, 1, 2) is not None
+        session.commit()
+        assert cache.get(1, 1, 2) is None
+    finally:
+        unregister_catalog_observer(cache)
+
+def test_cache_evicts_least_recently_used_shop():
+    cache = ShopImageCache(max_shops=2)
+    cache.set(1, 1, 1, (1, []))
+    cache.set(2, 1, 1, (1, []))
+    cache.get(1, 1, 1)
+    cache.set(3, 1, 1, (1, []))
+    assert cache.get(2, 1, 1) is None
+    assert cache.get(1, 1, 1) is not None
@@ -0,0 +1,167 @@
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from backend.main import app
+from backend.models import Shop
+from backend.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.shop_counts import shop_count_cache, shop_histogram
+from backend.search_cache import search_response_cache
+
+# 创建测试客户端
+client = TestClient(app)
+
+# 工厂函数生成 Shop 对象
+def create_shop(id, name, category="火锅", rating=4.5, avg_cost=75.0):
+    return Shop(
+        id=id,
+        name=name,
+        category=category,
+        rating=rating,
+        price_range="￥50-100",
+        avg_cost=avg_cost,
+        name_pinyin="",
+        category_pinyin="",
+        address="北京市朝阳区",
+        phone="1234567890",
+        business_hours="10:00-22:00",
+        image_url=None
+    )
+
+@pytest.fixture
+def mock_db_session():
+    # 使用 AsyncMock 模拟 AsyncSession
+    mock_session = AsyncMock(AsyncSession)
+
+    async def mock_get_db():
+        yield mock_session
+
+    # 清空总数缓存与响应缓存，避免测试之间相互影响
+    shop_count_cache.clear()
+    search_response_cache.clear()
+
+    app.dependency_overrides[get_db] = mock_get_db
+
+    yield mock_session
+
+    app.dependency_overrides.clear()
+
+def mock_search_page(mock_db_session, shops, image_rows):
+    # 同一个结果对象同时承担分页查询（scalars）和图片批量查询（all）
+    mock_result = MagicMock()
+    mock_scalars = MagicMock()
+    mock_scalars.all.return_value = shops
+    mock_result.scalars.return_value = mock_scalars
+    mock_result.all.return_value = image_rows
+    mock_db_session.execute = AsyncMock(return_value=mock_result)
+    mock_db_session.scalar = AsyncMock(return_value=len(shops))
+
+@pytest.mark.parametrize("page_size", [2, 50])
+def test_search_query_count_is_constant(mock_db_session, page_size):
+    shops = [create_shop(i, f"店铺{i}") for i in range(1, page_size + 1)]
+    image_rows = [(shop.id, f"https://img.example.com/{shop.id}.jpg") for shop in shops]
+    mock_search_page(mock_db_session, shops, image_rows)
+
+    response = client.get(f"/api/shops/search?page_size={page_size}")
+
+    assert response.status_code == 200
+    assert len(response.json()["data"]) == page_size
+    # 一次 count + 一次目录版本（ETag）查询 + 一次分页查询 + 一次图片批量查询，与每页条数无关
+    assert mock_db_session.scalar.await_count == 1
+    assert mock_db_session.execute.await_count == 3
+
+def test_search_images_attached_with_placeholder(mock_db_session):
+    shops = [create_shop(1, "火锅大师"), create_shop(2, "奶茶小屋", category="奶茶")]
+    image_rows = [(1, "https://img.example.com/a.jpg"), (1, "https://img.example.com/b.jpg")]
+    mock_search_page(mock_db_session, shops, image_rows)
+
+    response = client.get("/api/shops/search")
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data[0]["image_urls"] == ["https://img.example.com/a.jpg", "https://img.example.com/b.jpg"]
+    assert data[1]["image_urls"] == ["https://via.placeholder.com/150"]
+    assert data[0]["is_open"] in (True, False)
+
+def test_search_is_open_filter_runs_in_sql(mock_db_session):
+    shops = [create_shop(1, "火锅大师")]
+    mock_search_page(mock_db_session, shops, [])
+
+    response = client.get("/api/shops/search?is_open=true")
+
+    assert response.status_code == 200
+    # 营业中过滤作为 SQL 条件下推，不再额外全量查询店铺（另有一次目录版本查询）
+    assert mock_db_session.execute.await_count == 3
+    page_query = mock_db_session.execute.await_args_list[1].args[0]
+    assert "open_minute" in str(page_query)
+
+def test_search_keyword_does_not_write_history_inline(mock_db_session):
+    from backend.search_history import search_history_buffer
+    search_history_buffer.clear()
+    mock_search_page(mock_db_session, [create_shop(1, "火锅大师")], [])
+
+    response = client.get("/api/shops/search?keyword=火锅")
+
+    assert response.status_code == 200
+    # 读路径只有目录版本、count、分页、图片四次查询，不提交任何写事务
+    assert mock_db_session.execute.await_count == 3
+    mock_db_session.commit.assert_not_awaited()
+    assert [keyword for keyword, _ in search_history_buffer.pending()] == ["火锅"]
+    search_history_buffer.clear()
+
+def test_search_cursor_mode_skips_count(mock_db_session):
+    shops = [create_shop(i, f"店铺{i}", rating=4.5) for i in (9, 8, 7)]
+    mock_search_page(mock_db_session, shops, [])
+
+    response = client.get("/api/shops/search?sort_by=rating&page_size=2&cursor=")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] is None
+    assert [shop["id"] for shop in body["data"]] == [9, 8]
+    assert body["next_cursor"]
+    mock_db_session.scalar.assert_not_awaited()
+
+def test_search_total_served_from_count_cache(mock_db_session):
+    shops = [create_shop(1, "火锅大师")]
+    mock_search_page(mock_db_session, shops, [])
+
+    first = client.get("/api/shops/search?category=火锅&rating=4")
+    second = client.get("/api/shops/search?rating=4.0&category=火锅&page=2")
+
+    assert first.json()["total"] == second.json()["total"] == 1
+    # 第二次请求（另一页）命中总数缓存，只剩目录版本、分页与图片查询
+    assert mock_db_session.scalar.await_count == 1
+    assert mock_db_session.execute.await_count == 6
+
+def test_search_approx_total_from_histogram(mock_db_session):
+    mock_search_page(mock_db_session, [create_shop(1, "火锅大师")], [])
+    shop_histogram.on_shop_changed({"id": 1, "category": "火锅", "rating": 4.5})
+    shop_histogram.on_shop_changed({"id": 2, "category": "火锅", "rating": 3.9})
+    shop_histogram.on_shop_changed({"id": 3, "category": "奶茶", "rating": 4.8})
+    shop_histogram.ready = True
+    try:
+        response = client.get("/api/shops/search?category=火锅&rating=4&count_mode=approx")
+        assert response.json()["total"] == 1
+        assert response.json()["total_estimated"] is True
+        mock_db_session.scalar.assert_not_awaited()
+    finally:
+        for shop_id in (1, 2, 3):
+            shop_histogram.on_shop_deleted(shop_id)
+        shop_histogram.ready = False
+
+def test_search_response_cache_serves_identical_requests(mock_db_session):
+    mock_search_page(mock_db_session, [create_shop(1, "火锅大师")], [])
+
+    first = client.get("/api/shops/search?categories=火锅&categories=烧烤&rating=4")
+    second = client.get("/api/shops/search?rating=4.0&categories=烧烤&categories=火锅")
+
+    assert first.status_code == second.status_code == 200
+    assert first.content == second.content
+    assert first.headers["ETag"] == second.headers["ETag"]
+    # 第二次请求直接返回缓存的响应体，不查询数据库
+    assert mock_db_session.execute.await_count == 3
+
+    search_response_cache.on_shop_changed({"id": 1})
+    client.get("/api/shops/search?categories=火锅&categories=烧烤&rating=4")
+    assert mock_db_session.execute.await_count == 6
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.models import Base, Shop, Package
+from backend.catalog_events import register_catalog_observer, unregister_catalog_observer
+from backend.suggest import SuggestIndex, suggest_index
+
+client = TestClient(app)
+
+@pytest.fixture
+def index_with_session():
+    # 通过真实的 ORM 写入 + 提交驱动增量刷新
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    index = SuggestIndex()
+    register_catalog_observer(index)
+    with Session(engine) as db:
+        yield index, db
+    unregister_catalog_observer(index)
+
+def add_shop(db, name, category, rating, sales):
+    shop = Shop(name=name, category=category, rating=rating)
+    db.add(shop)
+    db.flush()
+    db.add(Package(title=f"{name}套餐", price=50, contents="套餐", sales=sales, shop_id=shop.id))
+    return shop
+
+def test_prefix_matches_chinese_pinyin_and_initials(index_with_session):
+    index, db = index_with_session
+    add_shop(db, "火锅大师", "火锅", 4.5, 10)
+    add_shop(db, "海底捞火锅", "火锅", 4.8, 300)
+    add_shop(db, "奶茶小屋", "奶茶", 4.0, 50)
+    db.commit()
+
+    for q in ("火锅", "huoguo", "hg", "HG"):
+        names = [s["name"] for s in index.suggest(q)["shops"]]
+        assert names == ["火锅大师"]
+    assert [c["name"] for c in index.suggest("hg")["categories"]] == ["火锅"]
+    assert [s["name"] for s in index.suggest("h")["shops"]] == ["海底捞火锅", "火锅大师"]
+
+def test_chinese_prefix_does_not_expand_to_initials(index_with_session):
+    index, db = index_with_session
+    add_shop(db, "火锅大师", "火锅", 4.5, 10)
+    add_shop(db, "汉堡王", "快餐", 4.9, 500)
+    add_shop(db, "好利来", "烘焙", 4.8, 300)
+    add_shop(db, "KFC南区店", "快餐", 4.2, 80)
+    db.commit()
+
+    # 汉字前缀只按原文匹配，不匹配首字母同为 "h" 或 "hg" 的店铺
+    assert [s["name"] for s in index.suggest("火")["shops"]] == ["火锅大师"]
+    assert [c["name"] for c in index.suggest("火锅")["categories"]] == ["火锅"]
+    assert index.suggest("烘")["shops"] == []
+    # 中英文混合输入只规整拉丁字母部分
+    assert [s["name"] for s in index.suggest("KFC 南")["shops"]] == ["KFC南区店"]
+    # 纯拉丁字母输入仍展开为全拼与首字母
+    assert [s["name"] for s in index.suggest("h")["shops"]] == ["汉堡王", "好利来", "火锅大师"]
+
+def test_incremental_refresh_and_rollback(index_with_session):
+    index, db = index_with_session
+    shop = add_shop(db, "奶茶小屋", "奶茶", 4.0, 5)
+    db.commit()
+
+    shop.name = "咖啡小屋"
+    db.commit()
+    assert index.suggest("nc")["shops"] == []
+    assert [s["name"] for s in index.suggest("kf")["shops"]] == ["咖啡小屋"]
+
+    add_shop(db, "可颂工坊", "面包", 5.0, 1)
+    db.rollback()
+    assert [s["name"] for s in index.suggest("k")["shops"]] == ["咖啡小屋"]
+
+    db.delete(shop)
+    db.commit()
+    assert index.suggest("kf")["shops"] == []
+
+def test_suggest_endpoint_routes_before_shop_detail():
+    suggest_index.on_shop_changed({"id": 1, "name": "火锅大师", "category": "火锅", "rating": 4.5})
+    try:
+        response = client.get("/api/shops/suggest?q=hg&limit=5")
+        assert response.status_code == 200
+        assert response.json()["shops"][0]["name"] == "火锅大师"
+    finally:
+        suggest_index.on_shop_deleted(1)
@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from backend.main import app
+from backend.models import User, Order, UserOrderStats
+
+client = TestClient(app)
+
+@pytest.fixture
+def engine(order_engine):
+    with Session(order_engine) as db:
+        db.add(User(id=1, username="alice", invitation_code="AAA111"))
+        db.add(User(id=2, username="bob", invitation_code="BBB222"))
+        db.commit()
+    return order_engine
+
+def load_stats(engine):
+    with Session(engine) as db:
+        return db.get(UserOrderStats, 1)
+
+def test_stats_follow_single_and_batch_orders(engine):
+    first = client.post("/api/orders", json={"package_id": 1, "invitation_code": "BBB222"})
+    assert first.status_code == 200
+    stats = load_stats(engine)
+    assert (stats.order_count, stats.total_spent) == (1, 99)
+    with Session(engine) as db:
+        assert stats.first_order_at == db.get(Order, first.json()["id"]).created_at
+
+    response = client.post("/api/orders/batch", json={"items": [{"package_id": 2}, {"package_id": 1}]})
+    assert response.status_code == 200
+    stats = load_stats(engine)
+    assert (stats.order_count, stats.total_spent) == (3, 247)
+    assert stats.first_order_at.isoformat() == first.json()["created_at"]
+
+    # 邀请码首单校验与订单总数都读取汇总
+    response = client.post("/api/orders", json={"package_id": 1, "invitation_code": "BBB222"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "仅首次下单可使用邀请码"
+
+    response = client.get("/api/user/orders", params={"page": 2, "page_size": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["page"], body["page_size"], body["total"], body["total_pages"]) == (2, 2, 3, 2)
+    assert [order["order_id"] for order in body["data"]] == [first.json()["id"]]
+
+    # 游标分页同样返回总数
+    response = client.get("/api/user/orders", params={"page_size": 2, "cursor": ""})
+    body = response.json()
+    assert (body["total"], body["total_pages"], len(body["data"])) == (3, 2, 2)
+    assert body["data"][0]["shop_name"] == "火锅大师"
+    response = client.get("/api/user/orders", params={"page_size": 2, "cursor": body["next_cursor"]})
+    assert [order["order_id"] for order in response.json()["data"]] == [first.json()["id"]]
+    assert response.json()["next_cursor"] is None
@@ -0,0 +1,41 @@
+import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from backend.models import Base, Shop, Package, Order
+from backend.order_history import USER_ORDER_KEYSET, user_orders_query, user_orders_page_query
+from backend.pagination import keyset_after
+
+def test_page_queries_match_full_ordering():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Shop(id=1, name="火锅大师", category="火锅", name_pinyin="huo guo da shi", category_pinyin="huo guo"))
+        db.add(Package(id=1, title="双人餐", price=99, contents="锅底*1", sales=0, shop_id=1))
+        created_at = datetime.datetime(2026, 10, 1)
+        for i in range(1, 13):
+            # 下单时间大量重复，按订单 ID 兜底排序
+            db.add(Order(id=i, user_id=1 if i != 5 else 2, package_id=1, voucher_code=str(i),
+                         order_amount=99, created_at=created_at + datetime.timedelta(hours=i // 3)))
+        db.commit()
+
+        expected = db.execute(user_orders_query(1)).all()
+        assert len(expected) == 11
+        assert expected[0]._mapping == {
+            "order_id": 12, "created_at": created_at + datetime.timedelta(hours=4),
+            "package_title": "双人餐", "shop_name": "火锅大师"
+        }
+
+        offset_pages = [db.execute(user_orders_page_query(1, offset, 4)).all() for offset in (0, 4, 8)]
+        assert [row for page in offset_pages for row in page] == expected
+
+        keyset_pages, last = [], None
+        while True:
+            query = user_orders_query(1)
+            if last is not None:
+                query = query.where(keyset_after(USER_ORDER_KEYSET, last.order_id))
+            rows = db.execute(query.limit(4)).all()
+            if not rows:
+                break
+            keyset_pages.extend(rows)
+            last = rows[-1]
+        assert keyset_pages == expected
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from backend.models import Base, VoucherCodeSequence
+from backend.voucher_codes import FeistelPermutation, VoucherCodeGenerator, luhn_check_digit, is_valid_voucher_code
+from tests.async_adapter import SyncSessionAdapter
+
+def test_permutation_is_bijection_within_domain():
+    permutation = FeistelPermutation(b"secret", domain=1000)
+    outputs = [permutation.permute(i) for i in range(1000)]
+    assert sorted(outputs) == list(range(1000))
+    # 不同密钥得到不同的置换
+    assert outputs != [FeistelPermutation(b"other", domain=1000).permute(i) for i in range(1000)]
+
+def test_luhn_check_digit():
+    assert luhn_check_digit("7992739871") == "3"
+    code = VoucherCodeGenerator(secret=b"secret").code_for(42)
+    assert len(code) == 16 and is_valid_voucher_code(code)
+    # 单个数字输错或相邻数字互换时校验失败
+    assert not is_valid_voucher_code(code[:3] + str((int(code[3]) + 1) % 10) + code[4:])
+    assert not is_valid_voucher_code("12345")
+
+def test_generators_allocate_disjoint_blocks():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session_factory = lambda: SyncSessionAdapter(Session(engine))
+    first = VoucherCodeGenerator(session_factory, secret=b"secret", block_size=4)
+    second = VoucherCodeGenerator(session_factory, secret=b"secret", block_size=4)
+
+    async def generate():
+        # 并发取号时同一进程只领取所需的序号块
+        codes = await asyncio.gather(*(first.next_code() for _ in range(6)))
+        return list(codes) + [await second.next_code() for _ in range(6)]
+
+    codes = asyncio.run(generate())
+    assert len(set(codes)) == 12
+    assert codes[:6] == [first.code_for(i) for i in range(6)]
+    assert codes[6:] == [second.code_for(i) for i in [8, 9, 10, 11, 12, 13]]
+    with Session(engine) as db:
+        assert db.scalar(select(VoucherCodeSequence.next_value)) == 16
+
+def test_secret_is_required(monkeypatch):
+    # 不回退到 JWT 的 SECRET_KEY 或默认值
+    monkeypatch.delenv("VOUCHER_CODE_SECRET", raising=False)
+    monkeypatch.setenv("SECRET_KEY", "jwt-secret")
+    with pytest.raises(RuntimeError):
+        VoucherCodeGenerator().check_secret()
+
+    monkeypatch.setenv("VOUCHER_CODE_SECRET", "voucher-secret")
+    assert VoucherCodeGenerator().code_for(7) == VoucherCodeGenerator(secret=b"voucher-secret").code_for(7)